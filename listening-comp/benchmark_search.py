@@ -0,0 +1,71 @@
+import argparse
+import tempfile
+import time
+import chromadb
+import numpy as np
+from dense_index import DenseIndex
+
+
+def time_queries(search, queries, repeats: int) -> float:
+    """Average milliseconds per query"""
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for query in queries:
+            search(query)
+    return (time.perf_counter() - started) * 1000 / (repeats * len(queries))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare Chroma HNSW search with in-memory NumPy brute force"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'questions':>10} {'chroma ms':>10} {'numpy ms':>10} {'recall@k':>9}")
+
+    for size in args.sizes:
+        embeddings = rng.standard_normal((size, args.dimension)).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        ids = [f"q{i}" for i in range(size)]
+        queries = rng.standard_normal((args.queries, args.dimension)).astype(np.float32)
+
+        with tempfile.TemporaryDirectory() as directory:
+            client = chromadb.PersistentClient(path=directory)
+            collection = client.create_collection("benchmark")
+            for start in range(0, size, 5000):
+                collection.add(
+                    ids=ids[start:start + 5000],
+                    embeddings=embeddings[start:start + 5000].tolist()
+                )
+
+            index = DenseIndex()
+            index.upsert(ids, embeddings)
+
+            def chroma_search(query):
+                return collection.query(
+                    query_embeddings=[query.tolist()], n_results=args.k, include=['distances']
+                )['ids'][0]
+
+            def numpy_search(query):
+                return index.search(query, args.k)[0]
+
+            chroma_ms = time_queries(chroma_search, queries, args.repeats)
+            numpy_ms = time_queries(numpy_search, queries, args.repeats)
+
+            # HNSW is approximate; brute force is exact, so measure Chroma's recall
+            recall = np.mean([
+                len(set(chroma_search(query)) & set(numpy_search(query))) / args.k
+                for query in queries
+            ])
+
+        print(f"{size:>10} {chroma_ms:>10.2f} {numpy_ms:>10.2f} {recall:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
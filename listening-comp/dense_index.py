@@ -0,0 +1,150 @@
+import threading
+import numpy as np
+from typing import List, Sequence, Tuple
+
+
+class DenseIndex:
+    """
+    Exact in-memory nearest-neighbour index over normalized float32 embeddings.
+
+    All vectors for a section sit in one contiguous matrix, so a top-k query is a
+    single matrix-vector product followed by ``np.argpartition``. For collections
+    up to a few tens of thousands of questions this is faster than an HNSW round
+    trip and returns exact results.
+    """
+
+    def __init__(self, dimension: int = 0, initial_capacity: int = 1024):
+        """
+        Initialize an empty index.
+
+        Args:
+            dimension (int): Embedding dimension (inferred from the first upsert if 0).
+            initial_capacity (int): Number of rows allocated up front.
+        """
+        self.dimension = dimension
+        self._initial_capacity = initial_capacity
+        self._matrix = np.zeros((initial_capacity if dimension else 0, dimension), dtype=np.float32)
+        self._ids = []
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+    def upsert(self, ids: Sequence[str], embeddings):
+        """Insert new vectors or replace the vectors of existing ids"""
+        if len(ids) == 0:
+            return
+        vectors = self._normalize(embeddings)
+
+        with self._lock:
+            if not self.dimension:
+                self.dimension = vectors.shape[1]
+                self._matrix = np.zeros((self._initial_capacity, self.dimension), dtype=np.float32)
+            elif vectors.shape[1] != self.dimension:
+                raise ValueError(f"Expected {self.dimension}-dim vectors, got {vectors.shape[1]}")
+
+            new_ids = [question_id for question_id in dict.fromkeys(ids) if question_id not in self._rows]
+            needed = len(self._ids) + len(new_ids)
+            if needed > self._matrix.shape[0]:
+                # Grow by doubling; copies into a fresh array so in-flight searches
+                # keep reading the old one
+                capacity = max(self._matrix.shape[0], self._initial_capacity)
+                while capacity < needed:
+                    capacity *= 2
+                grown = np.zeros((capacity, self.dimension), dtype=np.float32)
+                grown[:len(self._ids)] = self._matrix[:len(self._ids)]
+                self._matrix = grown
+
+            for question_id in new_ids:
+                self._rows[question_id] = len(self._ids)
+                self._ids.append(question_id)
+            rows = [self._rows[question_id] for question_id in ids]
+            self._matrix[rows] = vectors
+
+    def search_many(self, query_embeddings, k: int) -> List[Tuple[List[str], List[float]]]:
+        """
+        Find the k nearest vectors for each query.
+
+        Returns:
+            List[Tuple[List[str], List[float]]]: (ids, distances) per query, nearest
+            first. Distances are squared L2 between normalized vectors (2 - 2*cosine).
+        """
+        queries = self._normalize(query_embeddings)
+        with self._lock:
+            count = len(self._ids)
+            matrix = self._matrix[:count]
+            ids = self._ids  # append-only, so the first `count` entries are stable
+
+        if count == 0 or k <= 0:
+            return [([], []) for _ in range(len(queries))]
+
+        k = min(k, count)
+        similarities = queries @ matrix.T
+        results = []
+        for row in similarities:
+            if k < count:
+                top = np.argpartition(-row, k - 1)[:k]
+            else:
+                top = np.arange(count)
+            top = top[np.argsort(-row[top])]
+            results.append((
+                [ids[i] for i in top],
+                (2.0 - 2.0 * row[top]).clip(min=0.0).tolist()
+            ))
+        return results
+
+    def search(self, query_embedding, k: int) -> Tuple[List[str], List[float]]:
+        """Find the k nearest vectors for a single query"""
+        return self.search_many([query_embedding], k)[0]
+
+    def get_vectors(self, ids: Sequence[str]) -> np.ndarray:
+        """Return the normalized vectors for the given ids (which must be present)"""
+        with self._lock:
+            rows = [self._rows[question_id] for question_id in ids]
+            return self._matrix[rows].copy()
+
+
+def maximal_marginal_relevance(
+    query_embedding,
+    candidate_embeddings,
+    k: int,
+    lambda_mult: float = 0.5
+) -> List[int]:
+    """
+    Pick a relevant but diverse subset of candidates with maximal marginal relevance.
+
+    Args:
+        query_embedding: Query vector.
+        candidate_embeddings: One vector per candidate.
+        k (int): Number of candidates to select.
+        lambda_mult (float): 1.0 ranks purely by relevance, 0.0 purely by diversity.
+
+    Returns:
+        List[int]: Positions of the selected candidates, in selection order.
+    """
+    if len(candidate_embeddings) == 0 or k <= 0:
+        return []
+    candidates = DenseIndex._normalize(candidate_embeddings)
+    query = DenseIndex._normalize(query_embedding)[0]
+
+    relevance = candidates @ query
+    pairwise = candidates @ candidates.T
+
+    selected = [int(np.argmax(relevance))]
+    # Highest similarity of each candidate to anything already selected
+    redundancy = pairwise[selected[0]].copy()
+    while len(selected) < min(k, len(candidates)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        pick = int(np.argmax(scores))
+        selected.append(pick)
+        redundancy = np.maximum(redundancy, pairwise[pick])
+    return selected
@@ -0,0 +1,282 @@
+import os
+import pickle
+import sqlite3
+import threading
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlite_utils import select_in_chunks
+
+
+def _migrate_pickle(pickle_path: str, cache):
+    """Move entries from a legacy whole-file pickle cache into ``cache``, once"""
+    if not os.path.exists(pickle_path):
+        return
+    try:
+        with open(pickle_path, 'rb') as f:
+            legacy = pickle.load(f)
+        cache.put_many(legacy.items())
+        os.replace(pickle_path, pickle_path + ".migrated")
+    except Exception as e:
+        print(f"Error migrating embedding cache {pickle_path}: {str(e)}")
+
+
+class SQLiteEmbeddingCache:
+    """
+    Append-only embedding cache backed by a SQLite keyed store.
+
+    Vectors are stored as float32 blobs keyed by the text hash. Nothing is loaded
+    at construction time: lookups hit the primary key index on demand, and only
+    new entries are written back, so the cost of a call no longer grows with the
+    size of the cache.
+    """
+
+    def __init__(self, cache_dir: str, name: str):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir (str): Directory that holds the cache files.
+            name (str): Base name of the cache (usually derived from the model id).
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, f"{name}_cache.sqlite")
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "text_hash TEXT PRIMARY KEY, "
+            "vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+        # Import entries from the old whole-file pickle cache, if one is lying around
+        _migrate_pickle(os.path.join(cache_dir, f"{name}_cache.pkl"), self)
+
+    @staticmethod
+    def _encode(vector) -> bytes:
+        return np.asarray(vector, dtype=np.float32).tobytes()
+
+    @staticmethod
+    def _decode(blob: bytes) -> List[float]:
+        return np.frombuffer(blob, dtype=np.float32).tolist()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """Return the cached vectors for whichever of the keys are present"""
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            rows = select_in_chunks(
+                self._conn, "SELECT text_hash, vector FROM embeddings WHERE text_hash IN ({placeholders})", keys
+            )
+        return {text_hash: self._decode(blob) for text_hash, blob in rows}
+
+    def get(self, key: str) -> Optional[List[float]]:
+        """Return the cached vector for a key, or None"""
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Iterable[Tuple[str, List[float]]]):
+        """Persist new entries; existing keys are left untouched"""
+        rows = [(key, self._encode(vector)) for key, vector in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (text_hash, vector) VALUES (?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM embeddings WHERE text_hash = ?", (key,)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class MemmapEmbeddingCache:
+    """
+    Embedding cache holding all vectors in one contiguous float32 matrix.
+
+    The matrix lives in a file opened with ``np.memmap`` so every process that
+    opens the cache shares the same page-cached copy. A small SQLite table maps
+    each text hash to its row. Rows are only ever appended; the file grows by
+    doubling its capacity.
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, cache_dir: str, name: str):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir (str): Directory that holds the cache files.
+            name (str): Base name of the cache (usually derived from the model id).
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index_path = os.path.join(cache_dir, f"{name}_index.sqlite")
+        self.matrix_path = os.path.join(cache_dir, f"{name}_vectors.f32")
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._dimension = None
+
+        self._conn = sqlite3.connect(
+            self.index_path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            "text_hash TEXT PRIMARY KEY, "
+            "row INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+
+        # Bring over entries from the older cache formats, if present
+        _migrate_pickle(os.path.join(cache_dir, f"{name}_cache.pkl"), self)
+        self._migrate_sqlite(os.path.join(cache_dir, f"{name}_cache.sqlite"))
+
+    def _migrate_sqlite(self, sqlite_path: str):
+        """Move entries from a SQLiteEmbeddingCache store into the matrix, once"""
+        if not os.path.exists(sqlite_path):
+            return
+        try:
+            conn = sqlite3.connect(sqlite_path)
+            rows = conn.execute("SELECT text_hash, vector FROM embeddings").fetchall()
+            conn.close()
+            self.put_many((key, np.frombuffer(blob, dtype=np.float32)) for key, blob in rows)
+            os.replace(sqlite_path, sqlite_path + ".migrated")
+        except Exception as e:
+            print(f"Error migrating embedding cache {sqlite_path}: {str(e)}")
+
+    def _get_meta(self, key: str) -> Optional[int]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _map_matrix(self, min_rows: int = 0):
+        """(Re)map the matrix file if it is not mapped or smaller than min_rows"""
+        if self._dimension is None:
+            self._dimension = self._get_meta("dimension")
+            if self._dimension is None:
+                return None
+        if self._matrix is None or self._matrix.shape[0] < min_rows:
+            row_bytes = self._dimension * 4
+            rows = os.path.getsize(self.matrix_path) // row_bytes
+            self._matrix = np.memmap(
+                self.matrix_path, dtype=np.float32, mode='r+', shape=(rows, self._dimension)
+            )
+        return self._matrix
+
+    def _lookup_rows(self, keys: List[str]) -> Dict[str, int]:
+        return dict(select_in_chunks(
+            self._conn, "SELECT text_hash, row FROM rows WHERE text_hash IN ({placeholders})", keys
+        ))
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """Return the cached vectors for whichever of the keys are present"""
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            rows = self._lookup_rows(keys)
+            if not rows:
+                return {}
+            matrix = self._map_matrix(max(rows.values()) + 1)
+            return {key: matrix[row].tolist() for key, row in rows.items()}
+
+    def get(self, key: str) -> Optional[List[float]]:
+        """Return the cached vector for a key, or None"""
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Iterable[Tuple[str, List[float]]]):
+        """Append new entries to the matrix; existing keys are left untouched"""
+        items = dict(items)
+        if not items:
+            return
+
+        with self._lock:
+            # The immediate transaction serializes writers across processes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self._lookup_rows(list(items))
+                new_items = [(key, vector) for key, vector in items.items() if key not in existing]
+                if not new_items:
+                    self._conn.execute("COMMIT")
+                    return
+
+                vectors = np.asarray([vector for _, vector in new_items], dtype=np.float32)
+                dimension = self._get_meta("dimension")
+                if dimension is None:
+                    dimension = vectors.shape[1]
+                    self._conn.execute(
+                        "INSERT INTO meta (key, value) VALUES ('dimension', ?)", (dimension,)
+                    )
+                elif vectors.shape[1] != dimension:
+                    raise ValueError(f"Expected {dimension}-dim vectors, got {vectors.shape[1]}")
+                self._dimension = dimension
+
+                first_row = self._get_meta("rows") or 0
+                needed = first_row + len(new_items)
+
+                # Grow the file by doubling its capacity
+                row_bytes = dimension * 4
+                capacity = os.path.getsize(self.matrix_path) // row_bytes if os.path.exists(self.matrix_path) else 0
+                if capacity < needed:
+                    new_capacity = max(capacity, self.INITIAL_CAPACITY)
+                    while new_capacity < needed:
+                        new_capacity *= 2
+                    with open(self.matrix_path, 'ab') as f:
+                        f.truncate(new_capacity * row_bytes)
+
+                matrix = self._map_matrix(needed)
+                matrix[first_row:needed] = vectors
+                matrix.flush()
+
+                self._conn.executemany(
+                    "INSERT INTO rows (text_hash, row) VALUES (?, ?)",
+                    [(key, first_row + offset) for offset, (key, _) in enumerate(new_items)]
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('rows', ?)", (needed,)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return bool(self._lookup_rows([key]))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._get_meta("rows") or 0
+
+    def close(self):
+        with self._lock:
+            self._matrix = None
+            self._conn.close()
+
+
+CACHE_BACKENDS = {
+    "memmap": MemmapEmbeddingCache,
+    "sqlite": SQLiteEmbeddingCache,
+}
+
+
+def open_embedding_cache(backend: str, cache_dir: str, name: str):
+    """Open the embedding cache implementation registered under ``backend``"""
+    if backend not in CACHE_BACKENDS:
+        raise ValueError(f"Unknown embedding cache backend: {backend}")
+    return CACHE_BACKENDS[backend](cache_dir, name)
@@ -0,0 +1,163 @@
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+from vector_store import QuestionVectorStore, file_content_hash, iter_questions_from_file
+
+# Question files are named <video_id>_section<N>[anything].txt
+QUESTION_FILE_PATTERN = re.compile(r"^(?P<video_id>.+)_section(?P<section>\d+)")
+
+
+def find_question_files(directory: str) -> List[Tuple[str, str, int]]:
+    """
+    Find question files in a directory.
+
+    Args:
+        directory (str): Directory to scan.
+
+    Returns:
+        List[Tuple[str, str, int]]: (path, video_id, section_num) for each question file.
+    """
+    found = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        match = QUESTION_FILE_PATTERN.match(name)
+        if match and os.path.isfile(path):
+            found.append((path, match.group("video_id"), int(match.group("section"))))
+    return found
+
+
+def parse_question_file(path: str) -> Tuple[str, List[Dict]]:
+    """Parse one question file (runs in a worker process)"""
+    return path, list(iter_questions_from_file(path))
+
+
+class IndexManifest:
+    """
+    Record of which question files (by content hash) are already indexed.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the manifest.
+
+        Args:
+            path (str): JSON file holding the manifest.
+        """
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except Exception as e:
+                print(f"Error loading index manifest: {str(e)}")
+
+    def is_indexed(self, path: str, content_hash: str) -> bool:
+        return self.entries.get(os.path.basename(path), {}).get("content_hash") == content_hash
+
+    def mark_indexed(self, path: str, content_hash: str, count: int):
+        """Record a file as indexed and write the manifest atomically"""
+        self.entries[os.path.basename(path)] = {
+            "content_hash": content_hash,
+            "questions": count,
+            "indexed_at": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def index_directory(
+    directory: str,
+    store: Optional[QuestionVectorStore] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = 100,
+    force: bool = False
+) -> Dict[str, int]:
+    """
+    Index every question file in a directory.
+
+    Files whose content hash is already in the manifest are skipped. The rest
+    are parsed in a process pool, while embedding and writes go through this
+    process only, so there is a single writer to the store.
+
+    Args:
+        directory (str): Directory containing <video_id>_section<N> files.
+        store (QuestionVectorStore): Store to index into (created if omitted).
+        workers (int): Number of parser processes (defaults to the CPU count).
+        chunk_size (int): Questions per add_questions call.
+        force (bool): Re-index files even if their content hash is unchanged.
+
+    Returns:
+        Dict[str, int]: Number of questions indexed per file.
+    """
+    store = store or QuestionVectorStore()
+    manifest = IndexManifest(os.path.join(store.persist_directory, "indexed_files.json"))
+
+    pending = {}
+    for path, video_id, section_num in find_question_files(directory):
+        if section_num not in [2, 3]:
+            print(f"Skipping {path}: only sections 2 and 3 are currently supported")
+            continue
+        content_hash = file_content_hash(path)
+        if not force and manifest.is_indexed(path, content_hash):
+            print(f"Skipping {path}: already indexed")
+            continue
+        pending[path] = (video_id, section_num, content_hash)
+
+    started = time.time()
+    results = {}
+    total = 0
+    # Spawn the parser processes: by now the store has Chroma's runtime threads
+    # and SQLite connections open, which must not be copied by fork
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(parse_question_file, path) for path in pending]
+        for future in as_completed(futures):
+            try:
+                path, questions = future.result()
+            except Exception as e:
+                print(f"Error parsing question file: {str(e)}")
+                continue
+
+            video_id, section_num, content_hash = pending[path]
+            try:
+                for start in range(0, len(questions), chunk_size):
+                    store.add_questions(
+                        section_num, questions[start:start + chunk_size], video_id, start_index=start
+                    )
+            except Exception as e:
+                print(f"Error indexing {path}: {str(e)}")
+                continue
+
+            manifest.mark_indexed(path, content_hash, len(questions))
+            results[path] = len(questions)
+            total += len(questions)
+            elapsed = max(time.time() - started, 1e-9)
+            print(f"Indexed {len(questions)} questions from {path} "
+                  f"({total} total, {total / elapsed:.1f} questions/s)")
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index a directory of listening question files")
+    parser.add_argument("directory", help="Directory containing <video_id>_section<N> question files")
+    parser.add_argument("--workers", type=int, default=None, help="Number of parser processes")
+    parser.add_argument("--chunk-size", type=int, default=100, help="Questions per write")
+    parser.add_argument("--force", action="store_true", help="Re-index files that are unchanged")
+    args = parser.parse_args()
+
+    results = index_directory(
+        args.directory, workers=args.workers, chunk_size=args.chunk_size, force=args.force
+    )
+    print(f"Indexed {sum(results.values())} questions from {len(results)} files")
+
+
+if __name__ == "__main__":
+    main()
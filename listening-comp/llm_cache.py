@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+def response_cache_key(model_id: str, prompt: str, parameters: Dict) -> str:
+    """Content-addressed key for a generation request
+
+    Covers everything that determines the response: the model, the formatted
+    prompt and the sampling parameters.
+    """
+    request = json.dumps(
+        {"model": model_id, "inputs": prompt, "parameters": parameters},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Disk-backed cache of LLM responses, shared by every process on the host.
+
+    Responses live in a SQLite table (WAL mode, so readers in other processes
+    are never blocked by a writer) keyed by response_cache_key. The table is
+    bounded by total response size: when it grows past ``max_bytes``, the
+    least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = "data/llm_cache.sqlite", max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            path (str): SQLite database file, relative to the app directory.
+            max_bytes (int): Maximum total size of cached responses, in bytes.
+        """
+        # Make path relative to the app directory, so processes started from
+        # any working directory share one cache
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "cache_key TEXT PRIMARY KEY, "
+            "response TEXT NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+
+        # Running total, re-read from the table whenever we evict since other
+        # processes write to it too
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE cache_key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE cache_key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, response: str):
+        """Store a response, evicting least recently used entries if over budget"""
+        size = len(response.encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (cache_key, response, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, response, size, time.time())
+            )
+            self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop the oldest entries until the cache is back under max_bytes (caller holds the lock)"""
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        excess = self._total_bytes - self.max_bytes
+        if excess <= 0:
+            return
+
+        freed = 0
+        evicted = []
+        for key, size in self._conn.execute("SELECT cache_key, size FROM responses ORDER BY last_used"):
+            evicted.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE cache_key = ?", evicted)
+        self._total_bytes -= freed
+        self.evictions += len(evicted)
+
+    def metrics(self) -> Dict:
+        """Hit rate, entry count and size"""
+        with self._lock:
+            entries, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": total_bytes
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+import queue
+import random
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, Iterator, Optional
+import httpx
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Marks the end of a token stream
+_STREAM_END = object()
+
+
+class AsyncLLMClient:
+    """
+    Shared asynchronous HTTP client for LLM inference endpoints.
+
+    The client owns a pooled ``httpx.AsyncClient`` running on its own event loop
+    thread, so it can be shared by every Streamlit session (each script thread
+    has no event loop of its own). Requests are bounded by a semaphore, time
+    out, and are retried with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        timeout: float = 60,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_connections: int = 20
+    ):
+        """
+        Initialize the client and start its event loop thread.
+
+        Args:
+            max_concurrency (int): Maximum number of requests in flight.
+            timeout (float): Per-request timeout in seconds.
+            max_retries (int): Attempts per request before giving up.
+            base_delay (float): Base delay for exponential backoff, in seconds.
+            max_connections (int): Size of the connection pool.
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-client", daemon=True)
+        self._thread.start()
+
+        async def setup():
+            self._semaphore = asyncio.Semaphore(max_concurrency)
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(timeout),
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections
+                )
+            )
+        asyncio.run_coroutine_threadsafe(setup(), self._loop).result()
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Retry-After if the server sent one, else full-jitter exponential backoff
+
+        Retry-After is capped at the longest backoff we would use ourselves, so a
+        server asking for an hour does not hold a concurrency slot that long.
+        """
+        if response is not None and response.headers.get("Retry-After", "").isdigit():
+            return min(float(response.headers["Retry-After"]), self.base_delay * (2 ** self.max_retries))
+        return random.uniform(0, self.base_delay * (2 ** attempt))
+
+    async def _post_json(self, url: str, headers: Dict[str, str], payload: Dict) -> Any:
+        """POST a JSON payload and return the decoded response (runs on the client loop)"""
+        async with self._semaphore:
+            for attempt in range(self.max_retries):
+                response = None
+                try:
+                    response = await self._client.post(url, headers=headers, json=payload)
+                    if response.status_code not in RETRYABLE_STATUS:
+                        response.raise_for_status()
+                        return response.json()
+                    error = httpx.HTTPStatusError(
+                        f"Retryable status {response.status_code}", request=response.request, response=response
+                    )
+                except httpx.TransportError as e:
+                    error = e
+
+                logging.error(f"LLM request failed (attempt {attempt+1}/{self.max_retries}): {str(error)}")
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(self._retry_delay(attempt, response))
+            raise error
+
+    async def _stream_tokens(self, url: str, headers: Dict[str, str], payload: Dict, sink: queue.Queue):
+        """Stream a text-generation response (server-sent events) into a queue
+
+        Pushes each token's text, then an exception if the request failed, then
+        _STREAM_END. Requests are only retried before the first token arrives.
+        """
+        try:
+            async with self._semaphore:
+                for attempt in range(self.max_retries):
+                    started = False
+                    try:
+                        async with self._client.stream("POST", url, headers=headers, json=payload) as response:
+                            response.raise_for_status()
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                event = json.loads(line[len("data:"):])
+                                if "error" in event:
+                                    raise RuntimeError(event["error"])
+                                token = event.get("token") or {}
+                                if token.get("text") and not token.get("special"):
+                                    started = True
+                                    sink.put(token["text"])
+                        return
+                    except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                        retryable = isinstance(e, httpx.TransportError) or e.response.status_code in RETRYABLE_STATUS
+                        if started or not retryable or attempt == self.max_retries - 1:
+                            raise
+                        logging.error(f"LLM stream failed (attempt {attempt+1}/{self.max_retries}): {str(e)}")
+                        await asyncio.sleep(self._retry_delay(attempt, getattr(e, "response", None)))
+        except Exception as e:
+            sink.put(e)
+        finally:
+            sink.put(_STREAM_END)
+
+    def stream_tokens(self, url: str, headers: Dict[str, str], payload: Dict) -> Iterator[str]:
+        """Yield generated tokens as they arrive (blocking iterator, usable from any thread)"""
+        sink = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(self._stream_tokens(url, headers, payload, sink), self._loop)
+        try:
+            while True:
+                item = sink.get()
+                if item is _STREAM_END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Stop the request if the consumer gives up early
+            future.cancel()
+
+    def submit(self, url: str, headers: Dict[str, str], payload: Dict) -> Future:
+        """Schedule a request from any thread; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(self._post_json(url, headers, payload), self._loop)
+
+    async def post_json(self, url: str, headers: Dict[str, str], payload: Dict) -> Any:
+        """Await a request from any event loop"""
+        return await asyncio.wrap_future(self.submit(url, headers, payload))
+
+    def post_json_sync(self, url: str, headers: Dict[str, str], payload: Dict) -> Any:
+        """Blocking request; only the calling thread waits"""
+        return self.submit(url, headers, payload).result()
+
+    def close(self):
+        """Close the connection pool and stop the event loop"""
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_llm_client() -> AsyncLLMClient:
+    """Return the process-wide LLM client, creating it on first use"""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = AsyncLLMClient()
+        return _shared_client
@@ -1,9 +1,14 @@
+import time
+# Taken before the heavier imports below, for the startup report
+_script_started = time.perf_counter()
+
 import streamlit as st
 import sys
 import os
 import json
-from datetime import datetime
 from question_generator import QuestionGenerator
+from question_pool import QuestionPool
+from question_store import QuestionStore
 from audio_generator import AudioGenerator
 from get_transcript import YouTubeTranscriptDownloader
 import asyncio
@@ -18,48 +23,156 @@ st.set_page_config(
     layout="wide"
 )
 
-def load_stored_questions():
-    """Load previously stored questions from JSON file"""
-    questions_file = os.path.join(
-        os.path.dirname(os.path.abspath(__file__)),
-        "data/stored_questions.json"
+@st.cache_resource
+def get_question_generator() -> QuestionGenerator:
+    """Process-wide question generator shared by all sessions
+
+    Construction is cheap; the vector store inside it is only opened when a
+    question is first generated.
+    """
+    return QuestionGenerator()
+
+@st.cache_resource
+def get_question_pool() -> QuestionPool:
+    """Process-wide pool of pre-generated questions, refilled in the background"""
+    return QuestionPool(get_question_generator())
+
+@st.cache_resource
+def get_question_store() -> QuestionStore:
+    """Process-wide saved-question store; imports the old JSON file on first use"""
+    data_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    return QuestionStore(
+        os.path.join(data_directory, "stored_questions.sqlite"),
+        legacy_json_path=os.path.join(data_directory, "stored_questions.json")
     )
-    if os.path.exists(questions_file):
-        with open(questions_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+
+@st.cache_resource
+def get_audio_generator() -> AudioGenerator:
+    """Process-wide audio generator shared by all sessions"""
+    return AudioGenerator(output_directory="audio_files")
+
+@st.cache_resource
+def get_transcript_downloader() -> YouTubeTranscriptDownloader:
+    """Process-wide transcript downloader shared by all sessions"""
+    return YouTubeTranscriptDownloader(languages=["ms", "en"])
+
+def render_startup_report():
+    """Show how long app startup and lazily-built components took"""
+    with st.expander("Startup timings"):
+        st.caption(f"Script start to first render: {st.session_state.first_render_seconds:.2f}s")
+        timings = st.session_state.question_generator.startup_timings
+        if timings:
+            for name, seconds in timings.items():
+                st.caption(f"{name}: {seconds:.2f}s")
+        else:
+            st.caption("Vector store not loaded yet")
+
+    with st.expander("Question pool"):
+        metrics = get_question_pool().metrics()
+        st.caption(f"Hit rate: {metrics['hit_rate']:.0%} ({metrics['hits']} hits, {metrics['misses']} misses)")
+        st.caption(f"Ready: {metrics['ready']}, generating: {metrics['in_flight']}")
+        st.caption(f"Refills: {metrics['refills']} ({metrics['refill_failures']} failed), "
+                   f"avg {metrics['refill_latency_avg']:.1f}s, p50 {metrics['refill_latency_p50']:.1f}s")
+
+    with st.expander("LLM response cache"):
+        metrics = st.session_state.question_generator.response_cache.metrics()
+        st.caption(f"Hit rate: {metrics['hit_rate']:.0%} ({metrics['hits']} hits, {metrics['misses']} misses)")
+        st.caption(f"Entries: {metrics['entries']} ({metrics['bytes'] / 1024:.0f} KB), evictions: {metrics['evictions']}")
 
 def save_question(question, practice_type, topic, audio_file=None):
-    """Save a generated question to JSON file"""
-    questions_file = os.path.join(
-        os.path.dirname(os.path.abspath(__file__)),
-        "data/stored_questions.json"
-    )
-    
-    # Load existing questions
-    stored_questions = load_stored_questions()
-    
-    # Create a unique ID for the question using timestamp
-    question_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    # Add metadata
-    question_data = {
-        "question": question,
-        "practice_type": practice_type,
-        "topic": topic,
-        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "audio_file": audio_file
-    }
-    
-    # Add to stored questions
-    stored_questions[question_id] = question_data
-    
-    # Save back to file
-    os.makedirs(os.path.dirname(questions_file), exist_ok=True)
-    with open(questions_file, 'w', encoding='utf-8') as f:
-        json.dump(stored_questions, f, ensure_ascii=False, indent=2)
+    """Save a generated question to the question store and return its id"""
+    return get_question_store().add(question, practice_type, topic, audio_file)
+
+def render_question_fields(question, practice_type, show_options=False):
+    """Render the text fields of a (possibly partially generated) question"""
+    if practice_type == "Dialogue Practice":
+        st.write("**Introduction:**")
+        st.write(question.get('Introduction', ''))
+        st.write("**Conversation:**")
+        st.write(question.get('Conversation', ''))
+    else:
+        st.write("**Situation:**")
+        st.write(question.get('Situation', ''))
     
-    return question_id
+    st.write("**Question:**")
+    st.write(question.get('Question', ''))
+
+    if show_options and question.get('Options'):
+        st.write("**Options:**")
+        for i, option in enumerate(question['Options'], 1):
+            st.write(f"{i}. {option}")
+
+SAVED_QUESTIONS_PAGE_SIZE = 10
+
+def render_saved_questions():
+    """Sidebar browser for saved questions
+
+    Filters go into an indexed query and only the current page of questions is
+    fetched and turned into buttons, so rendering cost does not grow with the
+    number of saved questions.
+    """
+    store = get_question_store()
+    if len(store) == 0:
+        st.info("No saved questions yet. Generate some questions to see them here!")
+        return
+
+    st.header("Saved Questions")
+    search = st.text_input("Search", key="saved_search")
+    practice_type = st.selectbox(
+        "Practice type",
+        ["All", "Dialogue Practice", "Phrase Matching", "YouTube Content"],
+        key="saved_practice_type"
+    )
+    practice_type = None if practice_type == "All" else practice_type
+    topic = st.selectbox("Topic", ["All"] + store.list_topics(practice_type), key="saved_topic")
+    topic = None if topic == "All" else topic
+    date_range = st.date_input("Saved between", value=(), key="saved_dates")
+    created_from = date_range[0] if len(date_range) > 0 else None
+    created_to = date_range[1] if len(date_range) > 1 else created_from
+
+    filters = dict(
+        practice_type=practice_type,
+        topic=topic,
+        search=search.strip() or None,
+        created_from=created_from,
+        created_to=created_to
+    )
+
+    # Go back to the first page whenever the filters change
+    if st.session_state.get('saved_filters') != filters:
+        st.session_state.saved_filters = filters
+        st.session_state.saved_page = 0
+
+    total = store.count_questions(**filters)
+    if total == 0:
+        st.caption("No saved questions match these filters.")
+        return
+
+    pages = (total + SAVED_QUESTIONS_PAGE_SIZE - 1) // SAVED_QUESTIONS_PAGE_SIZE
+    page = min(st.session_state.saved_page, pages - 1)
+
+    for qdata in store.list_questions(limit=SAVED_QUESTIONS_PAGE_SIZE, offset=page * SAVED_QUESTIONS_PAGE_SIZE, **filters):
+        # Create a button for each question on this page
+        button_label = f"{qdata['practice_type']} - {qdata['topic']}\n{qdata['created_at']}"
+        if st.button(button_label, key=qdata['id']):
+            st.session_state.current_question = qdata['question']
+            st.session_state.current_question_id = qdata['id']
+            st.session_state.current_practice_type = qdata['practice_type']
+            st.session_state.current_topic = qdata['topic']
+            st.session_state.current_audio = qdata.get('audio_file')
+            st.session_state.feedback = None
+            st.rerun()
+
+    col_prev, col_next = st.columns(2)
+    with col_prev:
+        if st.button("Previous", disabled=page == 0, key="saved_prev"):
+            st.session_state.saved_page = page - 1
+            st.rerun()
+    with col_next:
+        if st.button("Next", disabled=page >= pages - 1, key="saved_next"):
+            st.session_state.saved_page = page + 1
+            st.rerun()
+    st.caption(f"Page {page + 1} of {pages} ({total} questions)")
 
 def render_interactive_stage():
     """Render the interactive learning stage
@@ -69,13 +182,12 @@ def render_interactive_stage():
     audio controls. It also handles user input and submits answers to the
     feedback system.
     """
-    # Initialize session state
-    if 'question_generator' not in st.session_state:
-        st.session_state.question_generator = QuestionGenerator()
-    if 'audio_generator' not in st.session_state:
-        st.session_state.audio_generator = AudioGenerator(output_directory="audio_files")
-    if 'transcript_downloader' not in st.session_state:
-        st.session_state.transcript_downloader = YouTubeTranscriptDownloader(languages=["ms", "en"])
+    # Initialize session state; heavyweight components are shared process-wide
+    if 'first_render_seconds' not in st.session_state:
+        st.session_state.first_render_seconds = time.perf_counter() - _script_started
+    st.session_state.question_generator = get_question_generator()
+    st.session_state.audio_generator = get_audio_generator()
+    st.session_state.transcript_downloader = get_transcript_downloader()
     if 'current_question' not in st.session_state:
         st.session_state.current_question = None
     if 'feedback' not in st.session_state:
@@ -86,32 +198,19 @@ def render_interactive_stage():
         st.session_state.current_topic = None
     if 'current_audio' not in st.session_state:
         st.session_state.current_audio = None
+    if 'current_question_id' not in st.session_state:
+        st.session_state.current_question_id = None
     if 'youtube_transcript' not in st.session_state:
         st.session_state.youtube_transcript = None
     
-    # Load stored questions for sidebar
-    stored_questions = load_stored_questions()
-    
     # Create sidebar
     with st.sidebar:
         st.title("Malay Listening Practice")
         st.write("Practice your Malay listening skills with AI-generated questions and audio.")
         
-        # Show saved questions in sidebar
-        if stored_questions:
-            st.header("Saved Questions")
-            for qid, qdata in stored_questions.items():
-                # Create a button for each question
-                button_label = f"{qdata['practice_type']} - {qdata['topic']}\n{qdata['created_at']}"
-                if st.button(button_label, key=qid):
-                    st.session_state.current_question = qdata['question']
-                    st.session_state.current_practice_type = qdata['practice_type']
-                    st.session_state.current_topic = qdata['topic']
-                    st.session_state.current_audio = qdata.get('audio_file')
-                    st.session_state.feedback = None
-                    st.rerun()
-        else:
-            st.info("No saved questions yet. Generate some questions to see them here!")
+        render_saved_questions()
+
+        render_startup_report()
     
     st.title("Malay Listening Comprehension Practice")
     
@@ -139,6 +238,10 @@ def render_interactive_stage():
     
     # Save current topic to session state
     st.session_state.current_topic = topic
+
+    # Start pre-generating questions for the selected topic
+    if practice_type != "YouTube Content":
+        get_question_pool().ensure(2 if practice_type == "Dialogue Practice" else 3, topic)
     
     # YouTube transcript section
     if practice_type == "YouTube Content":
@@ -261,44 +364,81 @@ def render_interactive_stage():
     # Generate new question button (for non-YouTube content)
     if practice_type != "YouTube Content" and st.button("Generate New Question"):
         section_num = 2 if practice_type == "Dialogue Practice" else 3
-        new_question = st.session_state.question_generator.generate_similar_question(
-            section_num, topic
-        )
+
+        # Serve a pre-generated question if one is ready; otherwise stream a
+        # fresh one into a placeholder as tokens arrive
+        new_question = get_question_pool().get(section_num, topic)
+        if new_question is None:
+            placeholder = st.empty()
+            last_render = 0.0
+            for partial in st.session_state.question_generator.generate_similar_question_stream(section_num, topic):
+                new_question = partial
+                if partial and time.perf_counter() - last_render > 0.1:
+                    with placeholder.container():
+                        render_question_fields(partial, practice_type, show_options=True)
+                    last_render = time.perf_counter()
+            placeholder.empty()
+
         st.session_state.current_question = new_question
         st.session_state.current_practice_type = practice_type
         st.session_state.current_topic = topic
         st.session_state.feedback = None
+        st.session_state.current_audio = None
+        st.session_state.current_question_id = None
         
         # Save the generated question
-        print(f"Saving question {new_question['question']} to file")
-        save_question(new_question, practice_type, topic)
-        st.session_state.current_audio = None
+        if new_question:
+            st.session_state.current_question_id = save_question(new_question, practice_type, topic)
+        else:
+            st.error("Failed to generate a question. Please try again.")
     
     if st.session_state.current_question:
         st.subheader("Practice Scenario")
         
         # Display question components
-        if practice_type == "Dialogue Practice":
-            st.write("**Introduction:**")
-            st.write(st.session_state.current_question['Introduction'])
-            st.write("**Conversation:**")
-            st.write(st.session_state.current_question['Conversation'])
-        else:
-            st.write("**Situation:**")
-            st.write(st.session_state.current_question['Situation'])
-        
-        st.write("**Question:**")
-        st.write(st.session_state.current_question['Question'])
+        render_question_fields(st.session_state.current_question, practice_type)
         
         col1, col2 = st.columns([2, 1])
         
         with col1:
             # Display options
             options = st.session_state.current_question['Options']
+            selected = st.radio(
+                "Choose your answer",
+                range(1, len(options) + 1),
+                format_func=lambda i: f"{i}. {options[i - 1]}"
+            )
+            
+            # Answers are checked locally against the answer recorded at generation
+            if st.button("Check Answer"):
+                st.session_state.feedback = st.session_state.question_generator.get_feedback(
+                    st.session_state.current_question, selected
+                )
+                if st.session_state.feedback is None:
+                    st.warning("This question has no recorded answer.")
             
             # If we have feedback, show which answers were correct/incorrect
             if st.session_state.feedback:
-                correct = st.session_state.feedback.get('correct', False)
+                feedback = st.session_state.feedback
+                correct_answer = feedback['correct_answer']
+                if feedback['correct']:
+                    st.success("Correct!")
+                else:
+                    st.error(f"Incorrect. The correct answer is {correct_answer}. {options[correct_answer - 1]}")
+                
+                # The explanation needs a model call, so only fetch it on request
+                if feedback.get('explanation'):
+                    st.info(feedback['explanation'])
+                elif st.button("Explain"):
+                    with st.spinner("Generating explanation..."):
+                        explanation = st.session_state.question_generator.get_explanation(
+                            st.session_state.current_question, feedback['selected_answer']
+                        )
+                    if explanation:
+                        feedback['explanation'] = explanation
+                        st.info(explanation)
+                    else:
+                        st.error("Failed to generate an explanation. Please try again.")
 
         with col2:
             # Generate audio button
@@ -320,13 +460,8 @@ def render_interactive_stage():
                         st.session_state.current_audio = audio_file
                         
                         # Update saved question with audio file
-                        if st.session_state.current_question.get('id'):
-                            save_question(
-                                st.session_state.current_question,
-                                practice_type,
-                                topic,
-                                audio_file
-                            )
+                        if st.session_state.current_question_id:
+                            get_question_store().set_audio(st.session_state.current_question_id, audio_file)
                         
                         st.success("Audio generated successfully!")
                         st.audio(audio_file)
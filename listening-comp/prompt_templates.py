@@ -0,0 +1,131 @@
+import re
+import threading
+from typing import Callable, Dict, List, Tuple
+
+# Chat prompt formatting without loading a tokenizer.
+#
+# Each supported model family has a hand-written formatter that reproduces its
+# chat template. Unknown models fall back to the Hugging Face tokenizer's
+# apply_chat_template, loaded once per model and cached.
+
+
+def _merge_system(messages: List[Dict]) -> Tuple[str, List[Dict]]:
+    """Split off leading system messages (joined) from the rest of the conversation"""
+    system = []
+    rest = list(messages)
+    while rest and rest[0]["role"] == "system":
+        system.append(rest.pop(0)["content"])
+    return "\n\n".join(system), rest
+
+
+def format_mistral(messages: List[Dict], add_generation_prompt: bool = True) -> str:
+    """Mistral instruct: <s>[INST] user [/INST] assistant</s>[INST] ...
+
+    Mistral has no system role, so system text is prepended to the first user turn.
+    """
+    system, messages = _merge_system(messages)
+    prompt = "<s>"
+    for idx, message in enumerate(messages):
+        content = message["content"]
+        if message["role"] == "user":
+            if idx == 0 and system:
+                content = f"{system}\n\n{content}"
+            prompt += f"[INST] {content} [/INST]"
+        else:
+            prompt += f"{content}</s>"
+    return prompt
+
+
+def format_llama2(messages: List[Dict], add_generation_prompt: bool = True) -> str:
+    """Llama 2 chat: [INST] <<SYS>> system <</SYS>> user [/INST]"""
+    system, messages = _merge_system(messages)
+    prompt = ""
+    for idx, message in enumerate(messages):
+        content = message["content"]
+        if message["role"] == "user":
+            if idx == 0 and system:
+                content = f"<<SYS>>\n{system}\n<</SYS>>\n\n{content}"
+            prompt += f"<s>[INST] {content.strip()} [/INST]"
+        else:
+            prompt += f" {content.strip()} </s>"
+    return prompt
+
+
+def format_llama3(messages: List[Dict], add_generation_prompt: bool = True) -> str:
+    """Llama 3 instruct header/eot format"""
+    prompt = "<|begin_of_text|>"
+    for message in messages:
+        prompt += f"<|start_header_id|>{message['role']}<|end_header_id|>\n\n{message['content'].strip()}<|eot_id|>"
+    if add_generation_prompt:
+        prompt += "<|start_header_id|>assistant<|end_header_id|>\n\n"
+    return prompt
+
+
+def format_zephyr(messages: List[Dict], add_generation_prompt: bool = True) -> str:
+    """Zephyr: <|role|>\\ncontent</s>"""
+    prompt = ""
+    for message in messages:
+        prompt += f"<|{message['role']}|>\n{message['content']}</s>\n"
+    if add_generation_prompt:
+        prompt += "<|assistant|>\n"
+    return prompt
+
+
+def format_chatml(messages: List[Dict], add_generation_prompt: bool = True) -> str:
+    """ChatML (Qwen and others): <|im_start|>role\\ncontent<|im_end|>"""
+    prompt = ""
+    for message in messages:
+        prompt += f"<|im_start|>{message['role']}\n{message['content']}<|im_end|>\n"
+    if add_generation_prompt:
+        prompt += "<|im_start|>assistant\n"
+    return prompt
+
+
+# Model id patterns, checked in order
+TEMPLATES: List[Tuple[re.Pattern, Callable]] = [
+    (re.compile(r"mistralai/(Mistral|Mixtral)-.*-Instruct", re.IGNORECASE), format_mistral),
+    (re.compile(r"meta-llama/(Meta-)?Llama-3", re.IGNORECASE), format_llama3),
+    (re.compile(r"meta-llama/Llama-2-.*-chat", re.IGNORECASE), format_llama2),
+    (re.compile(r"HuggingFaceH4/zephyr", re.IGNORECASE), format_zephyr),
+    (re.compile(r"Qwen/", re.IGNORECASE), format_chatml),
+]
+
+_tokenizers = {}
+_tokenizers_lock = threading.Lock()
+
+
+def find_template(model_id: str):
+    """Return the built-in formatter for a model id, or None"""
+    for pattern, formatter in TEMPLATES:
+        if pattern.search(model_id):
+            return formatter
+    return None
+
+
+def _get_tokenizer(model_id: str):
+    """Load a tokenizer once per process (only used for unknown models)"""
+    with _tokenizers_lock:
+        if model_id not in _tokenizers:
+            from transformers import AutoTokenizer
+            _tokenizers[model_id] = AutoTokenizer.from_pretrained(model_id)
+        return _tokenizers[model_id]
+
+
+def format_chat_prompt(model_id: str, messages: List[Dict], add_generation_prompt: bool = True) -> str:
+    """
+    Render chat messages into the prompt string a model expects.
+
+    Args:
+        model_id (str): Hugging Face model id.
+        messages (List[Dict]): Messages with "role" and "content".
+        add_generation_prompt (bool): Append the assistant turn header, if the format has one.
+
+    Returns:
+        str: The formatted prompt.
+    """
+    formatter = find_template(model_id)
+    if formatter is not None:
+        return formatter(messages, add_generation_prompt)
+    return _get_tokenizer(model_id).apply_chat_template(
+        messages, tokenize=False, add_generation_prompt=add_generation_prompt
+    )
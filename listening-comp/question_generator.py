@@ -1,17 +1,72 @@
+import asyncio
+import hashlib
 import json
-from typing import Dict, List, Optional
-from vector_store import QuestionVectorStore
-import requests
-from transformers import AutoTokenizer
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional
+from llm_cache import LLMResponseCache, response_cache_key
+from llm_client import get_llm_client
+from prompt_templates import format_chat_prompt
+from question_parser import (
+    NUM_OPTIONS,
+    REQUIRED_FIELDS,
+    QuestionParseError,
+    StreamingQuestionParser,
+    parse_question,
+    question_json_schema
+)
 
 class QuestionGenerator:
-    def __init__(self):
-        """Initialize Hugging Face client and vector store"""
-        self.vector_store = QuestionVectorStore()
+    def __init__(self, structured_output: bool = False):
+        """Initialize Hugging Face client settings
+
+        The vector store is heavyweight, so it is built on first use;
+        ``startup_timings`` records how long that took. Prompts are formatted
+        with the built-in chat templates in prompt_templates.py, so no
+        tokenizer is loaded for supported models.
+
+        With ``structured_output`` questions are generated as JSON constrained by
+        a JSON schema (the text-generation-inference ``grammar`` parameter), so
+        the output always has the expected fields and exactly four options.
+        """
+        self.structured_output = structured_output
+        self.repair_max_new_tokens = 512
+
+        # Explanations generated on request, per question and selected option
+        self.explanation_cache_size = 1024
+        self._explanations = OrderedDict()
+        self._explanations_lock = threading.Lock()
         self.model_id = "mistralai/Mistral-7B-Instruct-v0.2"  # Example model
         self.api_url = "https://api-inference.huggingface.co/models/" + self.model_id
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_id)
         self.headers = {"Authorization": f"Bearer {self._get_hf_api_key()}"}
+        self.startup_timings = {}
+        self._vector_store = None
+        self._init_lock = threading.Lock()
+
+        # Pooled client shared by every generator in the process
+        self.llm_client = get_llm_client()
+
+        # Responses to repeated prompts (explanations, repairs), shared across processes
+        self.response_cache = LLMResponseCache()
+
+    def _timed_init(self, name: str, factory):
+        """Build a component and record how long it took"""
+        started = time.perf_counter()
+        component = factory()
+        self.startup_timings[name] = time.perf_counter() - started
+        print(f"Initialized {name} in {self.startup_timings[name]:.2f}s")
+        return component
+
+    @property
+    def vector_store(self):
+        """Vector store, opened on first use"""
+        if self._vector_store is None:
+            with self._init_lock:
+                if self._vector_store is None:
+                    from vector_store import QuestionVectorStore
+                    self._vector_store = self._timed_init("vector_store", QuestionVectorStore)
+        return self._vector_store
 
     def _get_hf_api_key(self):
         """Get Hugging Face API key from environment variables"""
@@ -24,41 +79,116 @@ class QuestionGenerator:
             return ""
         return api_key
 
-    def _invoke_huggingface(self, prompt: str) -> Optional[str]:
-        """Invoke Hugging Face with the given prompt"""
-        try:
-            # Format prompt for the model
-            messages = [
-                {"role": "user", "content": prompt}
-            ]
-            
-            # Prepare payload
-            payload = {
-                "inputs": self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True),
-                "parameters": {
-                    "temperature": 0.7,
-                    "max_new_tokens": 1024,
-                    "top_p": 0.95,
-                }
+    def _build_payload(
+        self,
+        prompt: str,
+        stream: bool = False,
+        max_new_tokens: int = 1024,
+        temperature: float = 0.7,
+        grammar: Optional[Dict] = None
+    ) -> Dict:
+        """Build the text-generation request payload for a prompt"""
+        # Format prompt for the model
+        messages = [
+            {"role": "user", "content": prompt}
+        ]
+        
+        payload = {
+            "inputs": format_chat_prompt(self.model_id, messages),
+            "parameters": {
+                "temperature": temperature,
+                "max_new_tokens": max_new_tokens,
+                "top_p": 0.95,
+                "return_full_text": False,
             }
-            
-            # Make API request
-            response = requests.post(self.api_url, headers=self.headers, json=payload)
-            response.raise_for_status()
-            
-            # Extract generated text
-            result = response.json()
-            if isinstance(result, list) and len(result) > 0:
-                return result[0]["generated_text"].split("<assistant>")[-1].strip()
+        }
+        if grammar:
+            payload["parameters"]["grammar"] = grammar
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def _extract_generated_text(self, result) -> Optional[str]:
+        """Extract generated text from a text-generation response"""
+        if isinstance(result, list) and len(result) > 0:
+            return result[0]["generated_text"].split("<assistant>")[-1].strip()
+        return None
+
+    def _question_grammar(self, section_num: int) -> Optional[Dict]:
+        """Grammar constraining generation to a question's JSON schema, if enabled"""
+        if not self.structured_output:
             return None
+        return {"type": "json", "value": question_json_schema(section_num)}
+
+    def _cache_key(self, payload: Dict) -> str:
+        """Response cache key for a request payload"""
+        return response_cache_key(self.model_id, payload["inputs"], payload["parameters"])
+
+    def _invoke_huggingface(self, prompt: str, use_cache: bool = True, **parameters) -> Optional[str]:
+        """Invoke Hugging Face with the given prompt
+
+        Responses are served from and stored in the persistent response cache
+        unless ``use_cache`` is False. Extra keyword arguments are passed on to
+        _build_payload.
+        """
+        payload = self._build_payload(prompt, **parameters)
+        cache_key = self._cache_key(payload) if use_cache else None
+        if cache_key:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            result = self.llm_client.post_json_sync(self.api_url, self.headers, payload)
+            text = self._extract_generated_text(result)
         except Exception as e:
             print(f"Error invoking Hugging Face: {str(e)}")
             return None
 
-    def generate_similar_question(self, section_num: int, topic: str) -> Dict:
-        """Generate a new question similar to existing ones on a given topic"""
+        if cache_key and text:
+            self.response_cache.put(cache_key, text)
+        return text
+
+    def _stream_huggingface(self, prompt: str, **parameters) -> Iterator[str]:
+        """Invoke Hugging Face with streaming enabled, yielding tokens as they arrive"""
+        yield from self.llm_client.stream_tokens(
+            self.api_url, self.headers, self._build_payload(prompt, stream=True, **parameters)
+        )
+
+    async def _ainvoke_huggingface(self, prompt: str, use_cache: bool = True, **parameters) -> Optional[str]:
+        """Invoke Hugging Face with the given prompt without blocking the event loop
+
+        Response cache lookups are blocking SQLite calls, so they run in a thread.
+        """
+        payload = self._build_payload(prompt, **parameters)
+        cache_key = self._cache_key(payload) if use_cache else None
+        if cache_key:
+            cached = await asyncio.to_thread(self.response_cache.get, cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            result = await self.llm_client.post_json(self.api_url, self.headers, payload)
+            text = self._extract_generated_text(result)
+        except Exception as e:
+            print(f"Error invoking Hugging Face: {str(e)}")
+            return None
+
+        if cache_key and text:
+            await asyncio.to_thread(self.response_cache.put, cache_key, text)
+        return text
+
+    def _build_generation_prompt(self, section_num: int, topic: str, diverse: bool = True) -> Optional[str]:
+        """Build the generation prompt from similar stored questions
+
+        With ``diverse`` the examples are picked by maximal marginal relevance,
+        so the prompt does not spend tokens on near-duplicate examples.
+        """
         # Get similar questions for context
-        similar_questions = self.vector_store.search_similar_questions(section_num, topic, n_results=3)
+        if diverse:
+            similar_questions = self.vector_store.search_diverse(section_num, topic, n_results=3)
+        else:
+            similar_questions = self.vector_store.search_similar_questions(section_num, topic, n_results=3)
         
         if not similar_questions:
             return None
@@ -85,6 +215,16 @@ class QuestionGenerator:
                         context += f"{i}. {opt}\n"
             context += "\n"
 
+        if self.structured_output:
+            format_instruction = (
+                f"\n        Return the question as a JSON object with the keys {', '.join(REQUIRED_FIELDS[section_num])}, "
+                f"where Options is a list of exactly {NUM_OPTIONS} strings and Answer is the number of the correct option.\n"
+            )
+        else:
+            format_instruction = (
+                "\n        After the options, add a line \"Answer: \" followed by the number of the correct option.\n"
+            )
+
         # Create prompt for generating new question
         prompt = f"""Based on the following example Malay listening questions, create a new question about {topic}.
         The question should follow the same format but be different from the examples.
@@ -97,86 +237,156 @@ class QuestionGenerator:
         but with only one clearly correct answer. Return ONLY the question without any additional text.
         
         Use Malay language for all text. If you don't have examples in Malay, create a new question in Malay about {topic}.
-        
+        {format_instruction}
         New Question:
         """
+        return prompt
+
+    def generate_similar_question(self, section_num: int, topic: str, diverse: bool = True) -> Dict:
+        """Generate a new question similar to existing ones on a given topic"""
+        prompt = self._build_generation_prompt(section_num, topic, diverse)
+        if not prompt:
+            return None
 
         # Generate new question
-        response = self._invoke_huggingface(prompt)
+        # Sampled, so a cached response would repeat the same question every time
+        response = self._invoke_huggingface(prompt, use_cache=False, grammar=self._question_grammar(section_num))
         if not response:
             return None
+        return self._parse_generated_question(response, section_num)
+
+    def generate_similar_question_stream(self, section_num: int, topic: str, diverse: bool = True) -> Iterator[Optional[Dict]]:
+        """Stream a new question as it is generated
+
+        Yields partial questions (whatever fields have arrived so far) after each
+        token. The last item yielded is the fully parsed question, or None if
+        generation failed.
+        """
+        prompt = self._build_generation_prompt(section_num, topic, diverse)
+        if not prompt:
+            yield None
+            return
 
-        # Parse the generated question
+        parser = StreamingQuestionParser()
         try:
-            lines = response.strip().split('\n')
-            question = {}
-            current_key = None
-            current_value = []
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                if line.startswith("Introduction:"):
-                    if current_key:
-                        question[current_key] = ' '.join(current_value)
-                    current_key = 'Introduction'
-                    current_value = [line.replace("Introduction:", "").strip()]
-                elif line.startswith("Conversation:"):
-                    if current_key:
-                        question[current_key] = ' '.join(current_value)
-                    current_key = 'Conversation'
-                    current_value = [line.replace("Conversation:", "").strip()]
-                elif line.startswith("Situation:"):
-                    if current_key:
-                        question[current_key] = ' '.join(current_value)
-                    current_key = 'Situation'
-                    current_value = [line.replace("Situation:", "").strip()]
-                elif line.startswith("Question:"):
-                    if current_key:
-                        question[current_key] = ' '.join(current_value)
-                    current_key = 'Question'
-                    current_value = [line.replace("Question:", "").strip()]
-                elif line.startswith("Options:"):
-                    if current_key:
-                        question[current_key] = ' '.join(current_value)
-                    current_key = 'Options'
-                    current_value = []
-                elif line[0].isdigit() and line[1] == "." and current_key == 'Options':
-                    current_value.append(line[2:].strip())
-                elif current_key:
-                    current_value.append(line)
-            
-            if current_key:
-                if current_key == 'Options':
-                    question[current_key] = current_value
-                else:
-                    question[current_key] = ' '.join(current_value)
-            
-            # Ensure we have exactly 4 options
-            if 'Options' not in question or len(question.get('Options', [])) != 4:
-                # Use default options if we don't have exactly 4
-                question['Options'] = [
-                    "Makan nasi lemak",
-                    "Makan roti canai",
-                    "Makan char kway teow",
-                    "Makan laksa"
-                ]
-            
-            return question
+            for token in self._stream_huggingface(prompt, grammar=self._question_grammar(section_num)):
+                yield parser.feed(token)
         except Exception as e:
+            print(f"Error streaming from Hugging Face: {str(e)}")
+            yield None
+            return
+
+        yield self._parse_generated_question(parser.text, section_num) if parser.text.strip() else None
+
+    async def agenerate_similar_question(self, section_num: int, topic: str, diverse: bool = True) -> Dict:
+        """Async variant of generate_similar_question"""
+        # The vector search is blocking, so keep it off the event loop
+        prompt = await asyncio.to_thread(self._build_generation_prompt, section_num, topic, diverse)
+        if not prompt:
+            return None
+
+        response = await self._ainvoke_huggingface(prompt, use_cache=False, grammar=self._question_grammar(section_num))
+        if not response:
+            return None
+        # Parsing may need a blocking repair request
+        return await asyncio.to_thread(self._parse_generated_question, response, section_num)
+
+    def _parse_generated_question(self, response: str, section_num: int) -> Optional[Dict]:
+        """Parse and validate the generated question
+
+        If the text cannot be parsed even after local repairs, the model is asked
+        once to reformat it. Returns None, rather than a made-up question, when
+        that fails too.
+        """
+        try:
+            return parse_question(response, section_num).to_dict()
+        except QuestionParseError as e:
+            print(f"Generated question did not validate ({str(e)}), asking the model to repair it")
+            error = e
+
+        repaired = self._invoke_huggingface(
+            self._build_repair_prompt(response, section_num, error),
+            max_new_tokens=self.repair_max_new_tokens,
+            temperature=0.1,
+            grammar=self._question_grammar(section_num)
+        )
+        if not repaired:
+            return None
+        try:
+            return parse_question(repaired, section_num).to_dict()
+        except QuestionParseError as e:
             print(f"Error parsing generated question: {str(e)}")
             return None
 
-    def get_feedback(self, question: Dict, selected_answer: int) -> Dict:
-        """Generate feedback for the selected answer"""
-        if not question or 'Options' not in question:
+    def _build_repair_prompt(self, response: str, section_num: int, error: QuestionParseError) -> str:
+        """Build a short prompt asking the model to fix a malformed question"""
+        fields = REQUIRED_FIELDS[section_num]
+        if self.structured_output:
+            target = (
+                f"a JSON object with the keys {', '.join(fields)} (Options is a list of exactly {NUM_OPTIONS} strings, "
+                "Answer is the number of the correct option)."
+            )
+        else:
+            labels = ", ".join(f"{field}:" for field in fields)
+            target = (
+                f"lines starting with {labels} with exactly {NUM_OPTIONS} options numbered 1. to {NUM_OPTIONS} "
+                "under Options: and the number of the correct option after Answer:."
+            )
+        return (
+            f"The following question is malformed: {str(error)}.\n"
+            f"Rewrite it as {target} Keep the Malay text. Return ONLY the question.\n\n"
+            f"{response}"
+        )
+
+    def get_feedback(self, question: Dict, selected_answer: int) -> Optional[Dict]:
+        """Check the selected answer against the answer recorded at generation time
+
+        This is a local comparison; no model is called. Use get_explanation for
+        an explanation of the answer.
+
+        Returns:
+            Dict with ``correct`` and ``correct_answer`` (1-based), or None if the
+            question has no recorded answer.
+        """
+        if not question or 'Options' not in question or not question.get('Answer'):
             return None
 
-        # Create prompt for generating feedback
-        prompt = f"""Given this Malay listening question and the selected answer, provide feedback explaining if it's correct 
-        and why. Keep the explanation clear and concise.
+        correct_answer = question['Answer']
+        return {
+            "correct": selected_answer == correct_answer,
+            "selected_answer": selected_answer,
+            "correct_answer": correct_answer
+        }
+
+    async def aget_feedback(self, question: Dict, selected_answer: int) -> Optional[Dict]:
+        """Async variant of get_feedback"""
+        return self.get_feedback(question, selected_answer)
+
+    def _explanation_key(self, question: Dict, selected_answer: int) -> str:
+        """Cache key for an explanation: the question's content plus the selected option"""
+        content = json.dumps(question, sort_keys=True, ensure_ascii=False)
+        return f"{hashlib.md5(content.encode('utf-8')).hexdigest()}:{selected_answer}"
+
+    def _get_cached_explanation(self, key: str) -> Optional[str]:
+        """Return a cached explanation, marking it recently used"""
+        with self._explanations_lock:
+            if key not in self._explanations:
+                return None
+            self._explanations.move_to_end(key)
+            return self._explanations[key]
+
+    def _cache_explanation(self, key: str, explanation: str):
+        """Store an explanation, evicting the least recently used beyond the limit"""
+        with self._explanations_lock:
+            self._explanations[key] = explanation
+            self._explanations.move_to_end(key)
+            while len(self._explanations) > self.explanation_cache_size:
+                self._explanations.popitem(last=False)
+
+    def _build_explanation_prompt(self, question: Dict, selected_answer: int) -> str:
+        """Build the prompt asking the model to explain the answer"""
+        prompt = f"""Given this Malay listening question, explain briefly why the correct answer is correct
+        and, if the selected answer is different, why it is wrong. Keep the explanation clear and concise.
         
         """
         if 'Introduction' in question:
@@ -190,25 +400,37 @@ class QuestionGenerator:
         for i, opt in enumerate(question['Options'], 1):
             prompt += f"{i}. {opt}\n"
         
-        prompt += f"\nSelected Answer: {selected_answer}\n"
-        prompt += "\nProvide feedback in JSON format with these fields:\n"
-        prompt += "- correct: true/false\n"
-        prompt += "- explanation: brief explanation of why the answer is correct/incorrect\n"
-        prompt += "- correct_answer: the number of the correct option (1-4)\n"
-
-        # Get feedback
-        response = self._invoke_huggingface(prompt)
-        if not response:
+        prompt += f"\nCorrect Answer: {question['Answer']}\n"
+        prompt += f"Selected Answer: {selected_answer}\n"
+        prompt += "\nReturn ONLY the explanation.\n"
+        return prompt
+
+    def get_explanation(self, question: Dict, selected_answer: int) -> Optional[str]:
+        """Explain the answer to a question, generating it only on request
+
+        Explanations are cached per question and selected option, so asking
+        again (from any session) does not call the model.
+        """
+        if not question or not question.get('Answer'):
             return None
 
-        try:
-            # Parse the JSON response
-            feedback = json.loads(response.strip())
-            return feedback
-        except:
-            # If JSON parsing fails, return a basic response with a default correct answer
-            return {
-                "correct": False,
-                "explanation": "Unable to generate detailed feedback. Please try again.",
-                "correct_answer": 1  # Default to first option
-            }
+        key = self._explanation_key(question, selected_answer)
+        explanation = self._get_cached_explanation(key)
+        if explanation is None:
+            explanation = self._invoke_huggingface(self._build_explanation_prompt(question, selected_answer))
+            if explanation:
+                self._cache_explanation(key, explanation)
+        return explanation
+
+    async def aget_explanation(self, question: Dict, selected_answer: int) -> Optional[str]:
+        """Async variant of get_explanation"""
+        if not question or not question.get('Answer'):
+            return None
+
+        key = self._explanation_key(question, selected_answer)
+        explanation = self._get_cached_explanation(key)
+        if explanation is None:
+            explanation = await self._ainvoke_huggingface(self._build_explanation_prompt(question, selected_answer))
+            if explanation:
+                self._cache_explanation(key, explanation)
+        return explanation
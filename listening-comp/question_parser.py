@@ -0,0 +1,270 @@
+import json
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Field labels the model is asked to produce, in the order they appear
+QUESTION_FIELDS = ["Introduction", "Conversation", "Situation", "Question", "Options", "Answer"]
+
+FIELD_PATTERN = re.compile(r"^(%s):\s*(.*)$" % "|".join(QUESTION_FIELDS))
+OPTION_PATTERN = re.compile(r"^(\d+)[.)]\s*(.*)$")
+
+
+class StreamingQuestionParser:
+    """
+    Incremental parser for a question that is still being generated.
+
+    Text is fed in as tokens arrive; ``snapshot`` returns whatever fields have
+    been seen so far, including the partially generated current line, so the
+    UI can fill in Introduction/Conversation/Question/Options as they stream.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pending = ""
+        self._fields: Dict[str, List[str]] = {}
+        self._current_key: Optional[str] = None
+
+    def _consume_line(self, line: str):
+        """Apply one complete line to the parsed fields"""
+        line = line.strip()
+        if not line:
+            return
+
+        match = FIELD_PATTERN.match(line)
+        if match:
+            self._current_key = match.group(1)
+            self._fields[self._current_key] = []
+            if match.group(2):
+                self._fields[self._current_key].append(match.group(2).strip())
+            return
+
+        if self._current_key == 'Options':
+            option = OPTION_PATTERN.match(line)
+            if option:
+                self._fields['Options'].append(option.group(2).strip())
+            elif self._fields['Options']:
+                # Continuation of a wrapped option
+                self._fields['Options'][-1] += ' ' + line
+        elif self._current_key == 'Answer':
+            # The answer is one line; anything after it (e.g. an explanation)
+            # is ignored rather than joined into the option number
+            if not self._fields['Answer']:
+                self._fields['Answer'].append(line)
+        elif self._current_key:
+            self._fields[self._current_key].append(line)
+
+    def feed(self, text: str) -> Dict:
+        """Add newly generated text and return the current snapshot"""
+        self.text += text
+        self._pending += text
+        *lines, self._pending = self._pending.split('\n')
+        for line in lines:
+            self._consume_line(line)
+        return self.snapshot()
+
+    def snapshot(self) -> Dict:
+        """Fields parsed so far, with the in-progress line applied tentatively"""
+        saved_fields = {key: list(values) for key, values in self._fields.items()}
+        saved_key = self._current_key
+        self._consume_line(self._pending)
+        snapshot = {
+            key: values if key == 'Options' else ' '.join(values)
+            for key, values in self._fields.items()
+        }
+        self._fields, self._current_key = saved_fields, saved_key
+        return snapshot
+
+
+class QuestionParseError(ValueError):
+    """Raised when generated text cannot be turned into a valid question"""
+
+
+# Fields each section's questions must have
+REQUIRED_FIELDS = {
+    2: ["Introduction", "Conversation", "Question", "Options", "Answer"],
+    3: ["Situation", "Question", "Options", "Answer"],
+}
+
+# Free-text fields per section (the rest are Options and Answer)
+TEXT_FIELDS = {
+    section: [field for field in fields if field not in ("Options", "Answer")]
+    for section, fields in REQUIRED_FIELDS.items()
+}
+
+NUM_OPTIONS = 4
+
+CODE_FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+MARKDOWN_LABEL_PATTERN = re.compile(r"^[ \t#*]*(%s)[ \t*]*:[ \t*]*" % "|".join(QUESTION_FIELDS), re.MULTILINE)
+LETTER_OPTION_PATTERN = re.compile(r"^\s*\(?([A-Da-d])[.)]\s+", re.MULTILINE)
+# A leading option marker: "2", "2. Makan laksa", "(B)", "B) Makan laksa",
+# "2 - Makan laksa", "2 (Makan laksa)", "B: Makan laksa", or an explicit
+# "Option 2"/"Pilihan B". Anything else is rejected rather than guessing
+# from digits elsewhere in the text.
+ANSWER_PATTERN = re.compile(
+    r"^(?:(?:option|pilihan)\s*\(?([1-9]|[a-d])\b|\(?([1-9]|[a-d])(?:[.)]|\s*[-:(]|\)?$))",
+    re.IGNORECASE
+)
+
+
+@dataclass
+class GeneratedQuestion:
+    """A validated question, as produced by parse_question
+
+    ``answer`` is the 1-based number of the correct option.
+    """
+    section: int
+    question: str
+    options: List[str]
+    answer: int
+    introduction: str = ""
+    conversation: str = ""
+    situation: str = ""
+
+    def to_dict(self) -> Dict:
+        """Convert to the dict format used by the vector store and the app"""
+        if self.section == 2:
+            data = {"Introduction": self.introduction, "Conversation": self.conversation}
+        else:
+            data = {"Situation": self.situation}
+        data["Question"] = self.question
+        data["Options"] = list(self.options)
+        data["Answer"] = self.answer
+        return data
+
+
+def question_json_schema(section_num: int) -> Dict:
+    """JSON schema for constrained (grammar) generation of a question"""
+    properties = {field: {"type": "string", "minLength": 1} for field in TEXT_FIELDS[section_num]}
+    properties["Options"] = {
+        "type": "array",
+        "items": {"type": "string", "minLength": 1},
+        "minItems": NUM_OPTIONS,
+        "maxItems": NUM_OPTIONS
+    }
+    properties["Answer"] = {"type": "integer", "minimum": 1, "maximum": NUM_OPTIONS}
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": REQUIRED_FIELDS[section_num]
+    }
+
+
+def _parse_fields(text: str) -> Dict:
+    """Extract fields from JSON or from the labelled line format, in one pass"""
+    stripped = text.strip()
+    if stripped.startswith('{'):
+        try:
+            data = json.loads(stripped)
+        except json.JSONDecodeError as e:
+            raise QuestionParseError(f"Invalid JSON at line {e.lineno} column {e.colno}: {e.msg}")
+        if not isinstance(data, dict):
+            raise QuestionParseError(f"Expected a JSON object, got {type(data).__name__}")
+        return data
+
+    parser = StreamingQuestionParser()
+    parser.feed(text)
+    return parser.snapshot()
+
+
+def parse_answer(value) -> int:
+    """Read the correct option number from an int or a leading option marker such as "2" or "B) ..." """
+    if isinstance(value, bool):
+        raise QuestionParseError(f"Answer must be an option number, got {value!r}")
+    if isinstance(value, int):
+        answer = value
+    elif isinstance(value, str):
+        match = ANSWER_PATTERN.match(value.strip().strip('*').strip())
+        if not match:
+            raise QuestionParseError(f"Answer must be an option number, got {value!r}")
+        marker = (match.group(1) or match.group(2)).lower()
+        answer = int(marker) if marker.isdigit() else 'abcd'.index(marker) + 1
+    else:
+        raise QuestionParseError(f"Answer must be an option number, got {value!r}")
+
+    if not 1 <= answer <= NUM_OPTIONS:
+        raise QuestionParseError(f"Answer must be between 1 and {NUM_OPTIONS}, got {answer}")
+    return answer
+
+
+def validate_question(fields: Dict, section_num: int) -> GeneratedQuestion:
+    """Check parsed fields against the section's requirements"""
+    if section_num not in REQUIRED_FIELDS:
+        raise QuestionParseError(f"Unsupported section {section_num}")
+
+    missing = [field for field in REQUIRED_FIELDS[section_num] if not fields.get(field)]
+    if missing:
+        raise QuestionParseError(f"Missing field(s): {', '.join(missing)}")
+
+    for field in TEXT_FIELDS[section_num]:
+        if not isinstance(fields[field], str):
+            raise QuestionParseError(f"Field {field} must be text")
+
+    options = fields["Options"]
+    if not isinstance(options, list) or not all(isinstance(option, str) for option in options):
+        raise QuestionParseError("Options must be a list of strings")
+    options = [option.strip() for option in options]
+    if len(options) != NUM_OPTIONS:
+        raise QuestionParseError(f"Expected {NUM_OPTIONS} options, got {len(options)}")
+    if not all(options):
+        raise QuestionParseError("Options must not be empty")
+    if len(set(options)) != len(options):
+        raise QuestionParseError("Options must be distinct")
+
+    answer = parse_answer(fields["Answer"])
+
+    return GeneratedQuestion(
+        section=section_num,
+        question=fields["Question"].strip(),
+        options=options,
+        answer=answer,
+        introduction=fields.get("Introduction", "").strip() if section_num == 2 else "",
+        conversation=fields.get("Conversation", "").strip() if section_num == 2 else "",
+        situation=fields.get("Situation", "").strip() if section_num == 3 else ""
+    )
+
+
+def repair_text(text: str) -> str:
+    """Cheap local fixes for common formatting slips
+
+    Unwraps code fences, cuts any preamble before the first JSON object or field
+    label, strips markdown from labels (``**Question:**``) and turns lettered
+    options (``A.``/``b)``) into numbered ones.
+    """
+    fenced = CODE_FENCE_PATTERN.search(text)
+    if fenced:
+        text = fenced.group(1)
+
+    label = MARKDOWN_LABEL_PATTERN.search(text)
+    brace = text.find('{')
+    if brace != -1 and (label is None or brace < label.start()):
+        end = text.rfind('}')
+        return text[brace:end + 1] if end > brace else text[brace:]
+    if label:
+        text = text[label.start():]
+
+    text = MARKDOWN_LABEL_PATTERN.sub(lambda match: f"{match.group(1)}: ", text)
+    return LETTER_OPTION_PATTERN.sub(lambda match: f"{'abcd'.index(match.group(1).lower()) + 1}. ", text)
+
+
+def parse_question(text: str, section_num: int) -> GeneratedQuestion:
+    """
+    Parse and validate a generated question.
+
+    Accepts either the JSON produced by constrained generation or the labelled
+    line format. If the text does not validate as-is, local repairs are tried
+    once before giving up.
+
+    Raises:
+        QuestionParseError: With a precise reason if no valid question could be read.
+    """
+    try:
+        return validate_question(_parse_fields(text), section_num)
+    except QuestionParseError as first_error:
+        repaired = repair_text(text)
+        if repaired == text:
+            raise
+        try:
+            return validate_question(_parse_fields(repaired), section_num)
+        except QuestionParseError:
+            raise first_error
@@ -0,0 +1,111 @@
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlite_utils import select_in_chunks
+
+
+class QuestionPayloadStore:
+    """
+    Side store mapping question ids to their full question structure.
+
+    Payloads are kept as zlib-compressed JSON in a SQLite table, with an
+    in-memory LRU of decoded questions in front of it, so search hits can be
+    hydrated without storing or re-parsing JSON inside the vector store.
+    LRU entries expire after ``lru_ttl`` seconds, so questions re-indexed by
+    another process (index_questions.py) are picked up from SQLite.
+    """
+
+    def __init__(self, path: str, lru_size: int = 1024, lru_ttl: float = 300):
+        """
+        Initialize the payload store.
+
+        Args:
+            path (str): SQLite database file.
+            lru_size (int): Number of decoded questions kept in memory.
+            lru_ttl (float): Seconds a decoded question is served from memory.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.lru_size = lru_size
+        self.lru_ttl = lru_ttl
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS payloads ("
+            "question_id TEXT PRIMARY KEY, "
+            "section INTEGER NOT NULL, "
+            "payload BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _encode(question: Dict) -> bytes:
+        return zlib.compress(json.dumps(question, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    @staticmethod
+    def _decode(blob: bytes) -> Dict:
+        return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+    def _remember(self, question_id: str, question: Dict):
+        self._lru[question_id] = (time.monotonic(), question)
+        self._lru.move_to_end(question_id)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def put_many(self, section_num: int, items: Iterable[Tuple[str, Dict]]):
+        """Insert or replace the payloads for a set of question ids"""
+        items = list(items)
+        if not items:
+            return
+        rows = [(question_id, section_num, self._encode(question)) for question_id, question in items]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO payloads (question_id, section, payload) VALUES (?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+            for question_id, question in items:
+                self._remember(question_id, copy.deepcopy(question))
+
+    def get_many(self, question_ids: List[str]) -> Dict[str, Dict]:
+        """Return copies of the stored questions for whichever ids are present"""
+        found = {}
+        with self._lock:
+            missing = []
+            now = time.monotonic()
+            for question_id in question_ids:
+                entry = self._lru.get(question_id)
+                if entry is not None and now - entry[0] <= self.lru_ttl:
+                    self._lru.move_to_end(question_id)
+                    found[question_id] = entry[1]
+                else:
+                    missing.append(question_id)
+
+            rows = select_in_chunks(
+                self._conn, "SELECT question_id, payload FROM payloads WHERE question_id IN ({placeholders})", missing
+            )
+            for question_id, blob in rows:
+                question = self._decode(blob)
+                self._remember(question_id, question)
+                found[question_id] = question
+
+        # Hand out copies so callers can annotate results freely
+        return {question_id: copy.deepcopy(question) for question_id, question in found.items()}
+
+    def get(self, question_id: str) -> Optional[Dict]:
+        """Return a copy of the stored question, or None"""
+        return self.get_many([question_id]).get(question_id)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
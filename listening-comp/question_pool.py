@@ -0,0 +1,141 @@
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+
+class QuestionPool:
+    """
+    Pre-generated questions per (section, topic), refilled in the background.
+
+    ``get`` serves a ready question instantly when one is pooled. Whenever a pool
+    drops below ``low_watermark`` (counting refills already in flight), worker
+    threads generate questions with ``generator.generate_similar_question``
+    until it is back at ``target_size``. After failed refills a key backs off
+    exponentially, so an unavailable endpoint is not hit again on every rerun.
+    """
+
+    def __init__(
+        self,
+        generator,
+        target_size: int = 3,
+        low_watermark: int = 2,
+        workers: int = 2,
+        backoff_base: float = 5.0,
+        backoff_cap: float = 300.0
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            generator: QuestionGenerator used to fill the pool.
+            target_size (int): Number of questions to keep ready per (section, topic).
+            low_watermark (int): Refill when fewer than this many are ready or in flight.
+            workers (int): Number of background generation threads.
+            backoff_base (float): Initial delay before retrying a failing key, in seconds.
+            backoff_cap (float): Maximum delay before retrying a failing key, in seconds.
+        """
+        self.generator = generator
+        self.target_size = target_size
+        self.low_watermark = low_watermark
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="question-pool")
+
+        self._pools: Dict[Tuple[int, str], deque] = {}
+        self._in_flight: Dict[Tuple[int, str], int] = {}
+        # Consecutive failed refill rounds, the time of the last failure and the
+        # round it belonged to, per key. Jobs scheduled together form a round,
+        # so an outage that fails a whole round counts once
+        self._rounds = itertools.count(1)
+        self._failures: Dict[Tuple[int, str], int] = {}
+        self._last_failure: Dict[Tuple[int, str], float] = {}
+        self._failed_round: Dict[Tuple[int, str], int] = {}
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+        self.refill_failures = 0
+        self._refill_latencies = deque(maxlen=100)
+
+    def _schedule_refill(self, key: Tuple[int, str]):
+        """Top the pool for key back up to target_size (caller holds the lock)"""
+        failures = self._failures.get(key, 0)
+        if failures:
+            delay = min(self.backoff_base * 2 ** (failures - 1), self.backoff_cap)
+            if time.monotonic() < self._last_failure[key] + delay:
+                return
+        ready = len(self._pools.setdefault(key, deque()))
+        in_flight = self._in_flight.get(key, 0)
+        if ready + in_flight >= self.low_watermark:
+            return
+        refill_round = next(self._rounds)
+        for _ in range(self.target_size - ready - in_flight):
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+            self.executor.submit(self._refill_one, key, refill_round)
+
+    def _refill_one(self, key: Tuple[int, str], refill_round: int):
+        """Generate one question for key (runs on a worker thread)"""
+        section_num, topic = key
+        started = time.perf_counter()
+        try:
+            question = self.generator.generate_similar_question(section_num, topic)
+        except Exception as e:
+            print(f"Error refilling question pool for {key}: {str(e)}")
+            question = None
+
+        with self._lock:
+            self._in_flight[key] -= 1
+            if question:
+                self._pools[key].append(question)
+                self.refills += 1
+                self._refill_latencies.append(time.perf_counter() - started)
+                self._failures.pop(key, None)
+            else:
+                self.refill_failures += 1
+                if self._failed_round.get(key) != refill_round:
+                    self._failures[key] = self._failures.get(key, 0) + 1
+                    self._failed_round[key] = refill_round
+                self._last_failure[key] = time.monotonic()
+
+    def ensure(self, section_num: int, topic: str):
+        """Start filling the pool for a (section, topic) if it is running low"""
+        with self._lock:
+            self._schedule_refill((section_num, topic))
+
+    def get(self, section_num: int, topic: str) -> Optional[Dict]:
+        """Take a ready question, or return None if the pool is empty
+
+        Either way, a refill is scheduled if the pool is now below the watermark.
+        """
+        key = (section_num, topic)
+        with self._lock:
+            pool = self._pools.setdefault(key, deque())
+            question = pool.popleft() if pool else None
+            if question is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            self._schedule_refill(key)
+        return question
+
+    def metrics(self) -> Dict:
+        """Hit rate, refill counts and refill latency"""
+        with self._lock:
+            latencies = sorted(self._refill_latencies)
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "refills": self.refills,
+                "refill_failures": self.refill_failures,
+                "ready": sum(len(pool) for pool in self._pools.values()),
+                "in_flight": sum(self._in_flight.values()),
+                "refill_latency_avg": sum(latencies) / len(latencies) if latencies else 0.0,
+                "refill_latency_p50": latencies[len(latencies) // 2] if latencies else 0.0
+            }
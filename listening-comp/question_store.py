@@ -0,0 +1,256 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+
+class QuestionStore:
+    """
+    Saved questions in an indexed SQLite table.
+
+    Replaces the stored_questions.json file that was re-read and rewritten
+    whole on every save. Each save is a single-row insert, lookups go through
+    the primary key, and listings use an index on (practice_type, topic,
+    created_at), so cost no longer grows with the number of saved questions
+    and callers can fetch one page at a time.
+    WAL mode and a busy timeout let several app processes write concurrently.
+    """
+
+    def __init__(self, path: str, legacy_json_path: Optional[str] = None):
+        """
+        Initialize the store.
+
+        Args:
+            path (str): SQLite database file.
+            legacy_json_path (str): Old stored_questions.json to import once, if present.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS questions ("
+            "question_id TEXT PRIMARY KEY, "
+            "practice_type TEXT NOT NULL, "
+            "topic TEXT NOT NULL, "
+            "created_at TEXT NOT NULL, "
+            "audio_file TEXT, "
+            "question TEXT NOT NULL, "
+            "search_text TEXT NOT NULL DEFAULT '')"
+        )
+        self._add_search_text()
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS questions_type_topic_created "
+            "ON questions (practice_type, topic, created_at)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS questions_created ON questions (created_at)")
+        self._conn.commit()
+
+        if legacy_json_path:
+            self._migrate_json(legacy_json_path)
+
+    def _add_search_text(self):
+        """Add and backfill the search_text column on stores created before it existed"""
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(questions)")]
+        if "search_text" in columns:
+            return
+        self._conn.execute("ALTER TABLE questions ADD COLUMN search_text TEXT NOT NULL DEFAULT ''")
+        rows = self._conn.execute("SELECT question_id, topic, question FROM questions").fetchall()
+        self._conn.executemany(
+            "UPDATE questions SET search_text = ? WHERE question_id = ?",
+            [(self._search_text(json.loads(question), topic), question_id) for question_id, topic, question in rows]
+        )
+
+    @staticmethod
+    def _search_text(question: Dict, topic: str) -> str:
+        """Lower-cased text a question can be found by: its topic and every field's text"""
+        parts = [topic]
+        for value in question.values():
+            parts.extend(value if isinstance(value, list) else [value])
+        return " ".join(str(part) for part in parts).lower()
+
+    def _migrate_json(self, json_path: str):
+        """Move questions from the legacy JSON file into the store, once"""
+        if not os.path.exists(json_path):
+            return
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+            rows = [
+                (
+                    question_id,
+                    data['practice_type'],
+                    data['topic'],
+                    data['created_at'],
+                    data.get('audio_file'),
+                    json.dumps(data['question'], ensure_ascii=False),
+                    self._search_text(data['question'], data['topic'])
+                )
+                for question_id, data in legacy.items()
+            ]
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO questions "
+                    "(question_id, practice_type, topic, created_at, audio_file, question, search_text) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.commit()
+            os.replace(json_path, json_path + ".migrated")
+        except Exception as e:
+            print(f"Error migrating stored questions {json_path}: {str(e)}")
+
+    @staticmethod
+    def _new_id(created: datetime) -> str:
+        """Time-ordered id that stays unique when several saves land in the same second"""
+        return f"{created.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> Dict:
+        return {
+            "id": row["question_id"],
+            "question": json.loads(row["question"]),
+            "practice_type": row["practice_type"],
+            "topic": row["topic"],
+            "created_at": row["created_at"],
+            "audio_file": row["audio_file"]
+        }
+
+    def add(self, question: Dict, practice_type: str, topic: str, audio_file: Optional[str] = None) -> str:
+        """Save a question and return its id"""
+        created = datetime.now()
+        question_id = self._new_id(created)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO questions "
+                "(question_id, practice_type, topic, created_at, audio_file, question, search_text) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    question_id,
+                    practice_type,
+                    topic,
+                    created.strftime("%Y-%m-%d %H:%M:%S"),
+                    audio_file,
+                    json.dumps(question, ensure_ascii=False),
+                    self._search_text(question, topic)
+                )
+            )
+            self._conn.commit()
+        return question_id
+
+    def set_audio(self, question_id: str, audio_file: str) -> bool:
+        """Attach a generated audio file to a saved question; False if the id is unknown"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE questions SET audio_file = ? WHERE question_id = ?", (audio_file, question_id)
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def get(self, question_id: str) -> Optional[Dict]:
+        """Return a saved question record by id, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM questions WHERE question_id = ?", (question_id,)).fetchone()
+        return self._to_record(row) if row else None
+
+    @staticmethod
+    def _filter_clause(
+        practice_type: Optional[str] = None,
+        topic: Optional[str] = None,
+        search: Optional[str] = None,
+        created_from: Optional[date] = None,
+        created_to: Optional[date] = None
+    ) -> Tuple[str, List]:
+        """Build the WHERE clause and parameters shared by listing and counting"""
+        clauses, params = [], []
+        if practice_type:
+            clauses.append("practice_type = ?")
+            params.append(practice_type)
+        if topic:
+            clauses.append("topic = ?")
+            params.append(topic)
+        if created_from:
+            clauses.append("created_at >= ?")
+            params.append(created_from.strftime("%Y-%m-%d"))
+        if created_to:
+            clauses.append("created_at < ?")
+            params.append((created_to + timedelta(days=1)).strftime("%Y-%m-%d"))
+        if search:
+            # Case-insensitive substring of the question text or topic
+            escaped = search.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            clauses.append("search_text LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def list_questions(
+        self,
+        practice_type: Optional[str] = None,
+        topic: Optional[str] = None,
+        limit: Optional[int] = 20,
+        offset: int = 0,
+        search: Optional[str] = None,
+        created_from: Optional[date] = None,
+        created_to: Optional[date] = None
+    ) -> List[Dict]:
+        """
+        List saved questions, newest first.
+
+        Args:
+            practice_type (str): Only questions of this practice type.
+            topic (str): Only questions on this topic.
+            limit (int): Page size, or None for all matching questions.
+            offset (int): Number of matching questions to skip.
+            search (str): Only questions whose text or topic contains this.
+            created_from (date): Only questions saved on or after this day.
+            created_to (date): Only questions saved on or before this day.
+
+        Returns:
+            List[Dict]: Records with id, question, practice_type, topic, created_at and audio_file.
+        """
+        where, params = self._filter_clause(practice_type, topic, search, created_from, created_to)
+        params += [limit if limit is not None else -1, offset]
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM questions {where} ORDER BY created_at DESC, rowid DESC LIMIT ? OFFSET ?",
+                params
+            ).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def count_questions(
+        self,
+        practice_type: Optional[str] = None,
+        topic: Optional[str] = None,
+        search: Optional[str] = None,
+        created_from: Optional[date] = None,
+        created_to: Optional[date] = None
+    ) -> int:
+        """Number of saved questions matching the same filters as list_questions"""
+        where, params = self._filter_clause(practice_type, topic, search, created_from, created_to)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM questions {where}", params).fetchone()[0]
+
+    def list_topics(self, practice_type: Optional[str] = None) -> List[str]:
+        """Distinct topics of saved questions, optionally for one practice type"""
+        where, params = self._filter_clause(practice_type)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT topic FROM questions {where} ORDER BY topic", params
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,25 @@
+import sqlite3
+from typing import List, Sequence
+
+# Stay well below SQLite's bound-parameter limit
+SQLITE_CHUNK_SIZE = 500
+
+
+def select_in_chunks(conn: sqlite3.Connection, sql: str, keys: Sequence, chunk_size: int = SQLITE_CHUNK_SIZE) -> List:
+    """
+    Run a ``... IN ({placeholders})`` query over any number of keys.
+
+    Args:
+        conn (sqlite3.Connection): Connection to query (the caller holds any lock).
+        sql (str): Query with a ``{placeholders}`` field where the key list goes.
+        keys (Sequence): Values to bind, split into chunks of ``chunk_size``.
+
+    Returns:
+        List: The rows of every chunk, concatenated.
+    """
+    rows = []
+    for start in range(0, len(keys), chunk_size):
+        chunk = list(keys[start:start + chunk_size])
+        placeholders = ",".join("?" * len(chunk))
+        rows.extend(conn.execute(sql.format(placeholders=placeholders), chunk).fetchall())
+    return rows
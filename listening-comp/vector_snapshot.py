@@ -0,0 +1,123 @@
+import json
+import os
+import struct
+import zlib
+import numpy as np
+from typing import Dict
+
+# File layout:
+#   MAGIC | header length (uint64 LE) | header JSON | padding to ALIGNMENT
+#   | float32 embedding matrix (rows x dimension) | zlib-compressed JSON records
+# The embedding block is stored raw and aligned so it can be memory-mapped.
+MAGIC = b"QVSNAP01"
+ALIGNMENT = 64
+
+
+def write_snapshot(path: str, dimension: int, sections: Dict[int, Dict], model_id: str = ""):
+    """
+    Write a snapshot file.
+
+    Args:
+        path (str): Output file.
+        dimension (int): Embedding dimension.
+        sections (Dict[int, Dict]): Per section number, a dict with "embeddings"
+            (rows x dimension) and "records" (one dict per row with id, document,
+            metadata and question).
+        model_id (str): Embedding model the vectors came from.
+    """
+    matrices = []
+    records = []
+    section_headers = []
+    row = 0
+    for section_num, data in sorted(sections.items()):
+        count = len(data["records"])
+        if count:
+            matrices.append(np.asarray(data["embeddings"], dtype=np.float32).reshape(count, dimension))
+        records.extend(data["records"])
+        section_headers.append({"section": section_num, "first_row": row, "count": count})
+        row += count
+
+    matrix = np.concatenate(matrices) if matrices else np.zeros((0, dimension), dtype=np.float32)
+    payload = zlib.compress(json.dumps(records, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 6)
+
+    header = {
+        "version": 1,
+        "model_id": model_id,
+        "dimension": dimension,
+        "rows": int(matrix.shape[0]),
+        "sections": section_headers,
+        "payload_bytes": len(payload)
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    prefix_len = len(MAGIC) + 8 + len(header_bytes)
+    padding = (-prefix_len) % ALIGNMENT
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * padding)
+        f.write(np.ascontiguousarray(matrix, dtype='<f4').tobytes())
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> Dict:
+    """
+    Open a snapshot file.
+
+    Returns:
+        Dict: The header fields, plus "embeddings" (a read-only memory map of the
+        float32 matrix) and "records" (the decoded per-row records).
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a vector store snapshot")
+        (header_len,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_len).decode('utf-8'))
+        prefix_len = len(MAGIC) + 8 + header_len
+        matrix_offset = prefix_len + (-prefix_len) % ALIGNMENT
+        matrix_bytes = header["rows"] * header["dimension"] * 4
+        f.seek(matrix_offset + matrix_bytes)
+        records = json.loads(zlib.decompress(f.read(header["payload_bytes"])).decode('utf-8'))
+
+    if header["rows"]:
+        embeddings = np.memmap(
+            path, dtype='<f4', mode='r', offset=matrix_offset,
+            shape=(header["rows"], header["dimension"])
+        )
+    else:
+        embeddings = np.zeros((0, header["dimension"]), dtype=np.float32)
+
+    header["embeddings"] = embeddings
+    header["records"] = records
+    return header
+
+
+def section_slice(snapshot: Dict, section_num: int) -> slice:
+    """Rows of a section in a snapshot returned by read_snapshot"""
+    for section in snapshot["sections"]:
+        if section["section"] == section_num:
+            return slice(section["first_row"], section["first_row"] + section["count"])
+    return slice(0, 0)
+
+
+def main():
+    import argparse
+    from vector_store import QuestionVectorStore
+
+    parser = argparse.ArgumentParser(description="Export or import a vector store snapshot")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("path", help="Snapshot file")
+    args = parser.parse_args()
+
+    store = QuestionVectorStore()
+    if args.action == "export":
+        print(f"Exported {store.export_snapshot(args.path)} questions to {args.path}")
+    else:
+        print(f"Imported {store.import_snapshot(args.path)} questions from {args.path}")
+
+
+if __name__ == "__main__":
+    main()
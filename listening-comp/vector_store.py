@@ -3,25 +3,41 @@ from chromadb.utils import embedding_functions
 import json
 import os
 import time
+import copy
 import hashlib
-import pickle
+import itertools
+import logging
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from embedding_cache import open_embedding_cache
+from question_payloads import QuestionPayloadStore
+from dense_index import DenseIndex, maximal_marginal_relevance
+from vector_snapshot import read_snapshot, section_slice, write_snapshot
 
-class HuggingFaceEmbeddingFunction(embedding_functions.EmbeddingFunction):
-    def __init__(self, model_id="sentence-transformers/all-MiniLM-L6-v2"):
-        """Initialize Hugging Face embedding function"""
-        load_dotenv()
-        self.api_key = os.getenv("HUGGINGFACE_API_KEY")
-        if not self.api_key:
-            raise ValueError("HUGGINGFACE_API_KEY not found in environment variables")
-        
+class CachedEmbeddingFunction(embedding_functions.EmbeddingFunction):
+    """Base class for embedding backends that share the persistent embedding cache.
+
+    Subclasses implement ``_embed_batch``, which returns one vector per input
+    text (or None for texts that could not be embedded).
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        batch_size: int = 32,
+        cache_backend: str = "memmap",
+        cache_name: Optional[str] = None
+    ):
+        """Initialize the cache and batching settings"""
         self.model_id = model_id
-        self.api_url = f"https://api-inference.huggingface.co/models/{model_id}"
-        self.headers = {"Authorization": f"Bearer {self.api_key}"}
-        
+
         # Default embedding dimensions for common models
         self.embedding_dimensions = {
             "sentence-transformers/all-MiniLM-L6-v2": 384,
@@ -37,36 +53,14 @@ class HuggingFaceEmbeddingFunction(embedding_functions.EmbeddingFunction):
         )
         os.makedirs(self.cache_dir, exist_ok=True)
         
-        # Load cache if exists
-        self.cache = self._load_cache()
-        
-        # Retry settings
-        self.max_retries = 3
-        self.base_delay = 2  # seconds
-
-    def _get_cache_path(self):
-        """Get path to the cache file"""
-        return os.path.join(self.cache_dir, f"{self.model_id.replace('/', '_')}_cache.pkl")
-
-    def _load_cache(self):
-        """Load embedding cache from disk"""
-        cache_path = self._get_cache_path()
-        if os.path.exists(cache_path):
-            try:
-                with open(cache_path, 'rb') as f:
-                    return pickle.load(f)
-            except Exception as e:
-                print(f"Error loading embedding cache: {str(e)}")
-        return {}
+        # Open the persistent cache ("memmap" shares one float32 matrix across
+        # processes, "sqlite" stores one blob per entry); entries are read lazily
+        self.cache = open_embedding_cache(
+            cache_backend, self.cache_dir, cache_name or self.model_id.replace('/', '_')
+        )
 
-    def _save_cache(self):
-        """Save embedding cache to disk"""
-        cache_path = self._get_cache_path()
-        try:
-            with open(cache_path, 'wb') as f:
-                pickle.dump(self.cache, f)
-        except Exception as e:
-            print(f"Error saving embedding cache: {str(e)}")
+        # Number of texts embedded per batch
+        self.batch_size = max(1, batch_size)
 
     def _get_text_hash(self, text):
         """Create a hash for the text to use as cache key"""
@@ -91,73 +85,383 @@ class HuggingFaceEmbeddingFunction(embedding_functions.EmbeddingFunction):
             
         return embedding
 
+    def _embed_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Embed a batch of texts"""
+        raise NotImplementedError
+
+    def _embed_batches(self, text_batches: List[List[str]]) -> Iterator[List[Optional[List[float]]]]:
+        """Embed several batches, yielding results in input order"""
+        for texts in text_batches:
+            yield self._embed_batch(texts)
+
     def __call__(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for a list of texts using Hugging Face API with caching and retries"""
-        embeddings = []
-        
-        for text in texts:
-            # Check cache first
-            text_hash = self._get_text_hash(text)
-            if text_hash in self.cache:
-                embeddings.append(self.cache[text_hash])
-                continue
-                
-            # Not in cache, try API with retries
-            embedding = None
-            for attempt in range(self.max_retries):
-                try:
-                    payload = {"inputs": text}
-                    response = requests.post(self.api_url, headers=self.headers, json=payload)
-                    response.raise_for_status()
-                    
-                    embedding = response.json()
-                    
-                    # Handle different response formats
-                    if isinstance(embedding, list) and isinstance(embedding[0], list):
-                        # Some models return a list of lists
-                        embedding = embedding[0]
-                    
-                    # Cache the result
-                    self.cache[text_hash] = embedding
-                    embeddings.append(embedding)
-                    break
-                    
-                except Exception as e:
-                    import logging
-                    logging.error(f"Error generating embedding (attempt {attempt+1}/{self.max_retries}): {str(e)}")
-                    
-                    # Exponential backoff before retry
-                    if attempt < self.max_retries - 1:
-                        sleep_time = self.base_delay * (2 ** attempt)
-                        time.sleep(sleep_time)
-            
-            # If all retries failed, use fallback
-            if embedding is None:
-                print(f"All API attempts failed, using fallback embedding for: {text[:50]}...")
-                embedding = self._fallback_embedding(text)
-                self.cache[text_hash] = embedding  # Cache the fallback too
-                embeddings.append(embedding)
+        """Generate embeddings for a list of texts with caching"""
+        return self.embed_with_fallbacks(texts)[0]
+
+    def embed_with_fallbacks(self, texts: List[str]) -> Tuple[List[List[float]], List[bool]]:
+        """Generate embeddings, also reporting which ones are fallbacks
+
+        Cache misses are collected and embedded in batches of ``batch_size``
+        texts, then scattered back into the original input order. Texts that
+        could not be embedded get a deterministic fallback vector, flagged in
+        the second list; fallbacks are not cached, so a later call retries them.
+        """
+        embeddings = [None] * len(texts)
+        fallbacks = [False] * len(texts)
+
+        # Collect cache misses, deduplicating repeated texts within the call
+        hashes = [self._get_text_hash(text) for text in texts]
+        cached = self.cache.get_many(hashes)
+        missing = {}
+        for position, (text, text_hash) in enumerate(zip(texts, hashes)):
+            if text_hash in cached:
+                embeddings[position] = cached[text_hash]
+            else:
+                missing.setdefault(text_hash, (text, []))[1].append(position)
+
+        pending = list(missing.items())
+        batches = [pending[start:start + self.batch_size] for start in range(0, len(pending), self.batch_size)]
+        text_batches = [[text for _, (text, _) in batch] for batch in batches]
+
+        for batch, batch_embeddings in zip(batches, self._embed_batches(text_batches)):
+            new_entries = []
+            for (text_hash, (text, positions)), embedding in zip(batch, batch_embeddings):
+                # If all retries failed, use fallback
+                is_fallback = embedding is None
+                if is_fallback:
+                    print(f"All API attempts failed, using fallback embedding for: {text[:50]}...")
+                    embedding = self._fallback_embedding(text)
+                else:
+                    new_entries.append((text_hash, embedding))
+                for position in positions:
+                    embeddings[position] = embedding
+                    fallbacks[position] = is_fallback
+
+            # Persist only the real embeddings added by this batch
+            self.cache.put_many(new_entries)
+
+        return embeddings, fallbacks
+
+
+class HuggingFaceEmbeddingFunction(CachedEmbeddingFunction):
+    def __init__(
+        self,
+        model_id="sentence-transformers/all-MiniLM-L6-v2",
+        batch_size: int = 32,
+        cache_backend: str = "memmap",
+        max_concurrency: int = 4,
+        request_timeout: float = 30
+    ):
+        """Initialize Hugging Face embedding function"""
+        load_dotenv()
+        self.api_key = os.getenv("HUGGINGFACE_API_KEY")
+        if not self.api_key:
+            raise ValueError("HUGGINGFACE_API_KEY not found in environment variables")
         
-        # Save updated cache
-        self._save_cache()
+        super().__init__(model_id, batch_size=batch_size, cache_backend=cache_backend)
+        self.api_url = f"https://api-inference.huggingface.co/models/{model_id}"
+        self.headers = {"Authorization": f"Bearer {self.api_key}"}
         
+        # Retry settings
+        self.max_retries = 3
+        self.base_delay = 2  # seconds
+        self.request_timeout = request_timeout
+
+        # Pooled HTTP client so requests reuse TCP/TLS connections, and a bounded
+        # pool of workers so batches are fetched concurrently
+        self.max_concurrency = max(1, max_concurrency)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.max_concurrency
+        )
+        self.session.mount("https://", adapter)
+        self.session.headers.update(self.headers)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+
+    def _request_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Send one feature-extraction request for a batch of texts"""
+        payload = {"inputs": texts}
+        response = self.session.post(self.api_url, json=payload, timeout=self.request_timeout)
+        response.raise_for_status()
+
+        embeddings = response.json()
+        if not isinstance(embeddings, list) or len(embeddings) != len(texts):
+            raise ValueError(f"Expected {len(texts)} embeddings, got {type(embeddings).__name__}")
+
+        # Handle different response formats
+        results = []
+        for embedding in embeddings:
+            if isinstance(embedding, list) and embedding and isinstance(embedding[0], list):
+                # Some models return a list of lists
+                embedding = embedding[0]
+            results.append(embedding)
+        return results
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        """Seconds to wait before the next attempt: Retry-After if given, else jittered backoff
+
+        Retry-After is capped at the longest backoff we would use ourselves, so a
+        server asking for an hour does not tie up a worker for that long.
+        """
+        response = getattr(error, "response", None)
+        if response is not None and response.headers.get("Retry-After", "").isdigit():
+            return min(float(response.headers["Retry-After"]), self.base_delay * (2 ** self.max_retries))
+        return random.uniform(0, self.base_delay * (2 ** attempt))
+
+    def _embed_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Embed a batch of texts with retries, returning None for texts that failed"""
+        for attempt in range(self.max_retries):
+            try:
+                return self._request_embeddings(texts)
+            except Exception as e:
+                logging.error(f"Error generating embeddings for batch of {len(texts)} (attempt {attempt+1}/{self.max_retries}): {str(e)}")
+
+                # Back off before retrying; only this worker waits, other batches keep going
+                if attempt < self.max_retries - 1:
+                    time.sleep(self._retry_delay(attempt, e))
+        return [None] * len(texts)
+
+    def _embed_batches(self, text_batches: List[List[str]]) -> Iterator[List[Optional[List[float]]]]:
+        """Fetch batches concurrently, at most max_concurrency requests in flight"""
+        if len(text_batches) <= 1:
+            yield from super()._embed_batches(text_batches)
+            return
+        yield from self.executor.map(self._embed_batch, text_batches)
+
+
+# Local models are expensive to load, so each one is loaded once per process
+_local_models = {}
+_local_models_lock = threading.Lock()
+
+
+def _load_local_model(model_id: str, device: str):
+    """Load a sentence-transformers model once per process"""
+    key = (model_id, device)
+    with _local_models_lock:
+        if key not in _local_models:
+            from sentence_transformers import SentenceTransformer
+            _local_models[key] = SentenceTransformer(model_id, device=device)
+        return _local_models[key]
+
+
+class LocalEmbeddingFunction(CachedEmbeddingFunction):
+    """Embed texts in-process on the CPU with sentence-transformers.
+
+    The model is shared by every instance in the process and batches are
+    encoded on a small thread pool, so query latency is bounded by local
+    compute and works without network access.
+    """
+
+    def __init__(
+        self,
+        model_id="sentence-transformers/all-MiniLM-L6-v2",
+        batch_size: int = 32,
+        cache_backend: str = "memmap",
+        device: str = "cpu",
+        max_workers: int = 2
+    ):
+        """Initialize the local embedding function"""
+        super().__init__(
+            model_id,
+            batch_size=batch_size,
+            cache_backend=cache_backend,
+            cache_name=f"{model_id.replace('/', '_')}_local"
+        )
+        self.device = device
+        self.model = _load_local_model(model_id, device)
+        self.max_workers = max(1, max_workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        return self.model.encode(
+            texts, batch_size=len(texts), normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32).tolist()
+
+    def _embed_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Encode a batch, splitting it across the thread pool"""
+        chunk_size = max(1, -(-len(texts) // self.max_workers))
+        chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+        embeddings = []
+        for chunk_embeddings in self.executor.map(self._encode, chunks):
+            embeddings.extend(chunk_embeddings)
         return embeddings
 
+
+EMBEDDING_BACKENDS = {
+    "huggingface": HuggingFaceEmbeddingFunction,
+    "local": LocalEmbeddingFunction,
+}
+
+
+def create_embedding_function(backend: Optional[str] = None, **kwargs) -> CachedEmbeddingFunction:
+    """Create the embedding function for a backend name.
+
+    The backend defaults to the EMBEDDING_BACKEND environment variable,
+    falling back to "huggingface".
+    """
+    load_dotenv()
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "huggingface")
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+    return EMBEDDING_BACKENDS[backend](**kwargs)
+
+
+def iter_questions(lines: Iterable[str]) -> Iterator[Dict]:
+    """Yield each <question> block from an iterable of lines as it is parsed"""
+    lines = iter(lines)
+    current_question = {}
+
+    for line in lines:
+        line = line.strip()
+
+        if line.startswith('<question>'):
+            current_question = {}
+        elif line.startswith('Introduction:'):
+            value = next(lines, None)
+            if value is not None:
+                current_question['Introduction'] = value.strip()
+        elif line.startswith('Conversation:'):
+            value = next(lines, None)
+            if value is not None:
+                current_question['Conversation'] = value.strip()
+        elif line.startswith('Situation:'):
+            value = next(lines, None)
+            if value is not None:
+                current_question['Situation'] = value.strip()
+        elif line.startswith('Question:'):
+            value = next(lines, None)
+            if value is not None:
+                current_question['Question'] = value.strip()
+        elif line.startswith('Options:'):
+            options = []
+            for _ in range(4):
+                option = next(lines, None)
+                if option is not None:
+                    option = option.strip()
+                    if option.startswith('1.') or option.startswith('2.') or option.startswith('3.') or option.startswith('4.'):
+                        options.append(option[2:].strip())
+            current_question['Options'] = options
+        elif line.startswith('</question>'):
+            if current_question:
+                yield current_question
+                current_question = {}
+
+
+def iter_questions_from_file(filename: str) -> Iterator[Dict]:
+    """Stream questions from a structured text file without reading it all into memory"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        yield from iter_questions(f)
+
+
+def question_content_hash(question: Dict, tags: Optional[List[str]] = None) -> str:
+    """Stable hash of a question's content (and tags, if any), independent of key order"""
+    content = {"question": question, "tags": sorted(tags)} if tags else question
+    canonical = json.dumps(content, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def build_where(
+    video_id: Optional[Union[str, List[str]]] = None,
+    tags: Optional[List[str]] = None,
+    where: Optional[Dict] = None
+) -> Optional[Dict]:
+    """Combine metadata filters into a single Chroma ``where`` clause"""
+    clauses = []
+    if isinstance(video_id, str):
+        clauses.append({"video_id": video_id})
+    elif video_id:
+        clauses.append({"video_id": {"$in": list(video_id)}})
+    for tag in tags or []:
+        clauses.append({f"tag_{tag}": True})
+    if where:
+        clauses.append(where)
+
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+
+def file_content_hash(filename: str) -> str:
+    """SHA-256 of a file's contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class QueryResultCache:
+    """Thread-safe LRU cache with a time-to-live for search results"""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return a copy of the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
 class QuestionVectorStore:
-    def __init__(self, persist_directory: str = "data/vectorstore"):
-        """Initialize the vector store for JLPT listening questions"""
+    def __init__(
+        self,
+        persist_directory: str = "data/vectorstore",
+        embedding_batch_size: int = 32,
+        embedding_backend: Optional[str] = None,
+        query_cache_size: int = 256,
+        query_cache_ttl: float = 300,
+        in_memory_search: bool = False
+    ):
+        """Initialize the vector store for JLPT listening questions
+
+        With ``in_memory_search`` each section's embeddings are also kept in a
+        NumPy ``DenseIndex`` and searches are answered by exact brute force
+        instead of a Chroma query (best for collections under ~50k questions).
+        """
         # Make persist_directory relative to the app directory
         self.persist_directory = os.path.join(
             os.path.dirname(os.path.abspath(__file__)),
             persist_directory
         )
         os.makedirs(self.persist_directory, exist_ok=True)
+
+        # Resume checkpoints for index_questions_file
+        self.checkpoint_directory = os.path.join(self.persist_directory, "index_checkpoints")
+        os.makedirs(self.checkpoint_directory, exist_ok=True)
         
         # Initialize ChromaDB client
         self.client = chromadb.PersistentClient(path=self.persist_directory)
         
-        # Use Hugging Face embedding model
-        self.embedding_fn = HuggingFaceEmbeddingFunction()
+        # Embedding backend is chosen by argument or EMBEDDING_BACKEND ("huggingface" or "local")
+        self.embedding_fn = create_embedding_function(
+            embedding_backend, batch_size=embedding_batch_size
+        )
         
         # Create or get collections for each section type
         self.collections = {
@@ -173,29 +477,94 @@ class QuestionVectorStore:
             )
         }
 
-    def add_questions(self, section_num: int, questions: List[Dict], video_id: str):
-        """Add questions to the vector store"""
+        # Full question structures live in a side store, not in Chroma metadata.
+        # Its in-memory copies expire like cached search results, so questions
+        # re-indexed by another process are not served stale indefinitely
+        self.payloads = QuestionPayloadStore(
+            os.path.join(self.persist_directory, "question_payloads.sqlite"),
+            lru_ttl=query_cache_ttl
+        )
+
+        # Search results are cached per collection version; add_questions bumps
+        # the version so stale results are never served
+        self.query_cache = QueryResultCache(query_cache_size, query_cache_ttl)
+        self.collection_versions = {name: 0 for name in self.collections}
+
+        # Dense indexes are loaded from Chroma on first use, then kept up to date
+        # by add_questions. Writes from other processes (index_questions.py) are
+        # picked up by reloading when the collection's size changes, or after
+        # the same TTL as cached search results
+        self.in_memory_search = in_memory_search
+        self.dense_indexes = {}
+        self.dense_index_ttl = query_cache_ttl
+        self._dense_loaded_at = {}
+        self._dense_lock = threading.Lock()
+
+    def add_questions(
+        self,
+        section_num: int,
+        questions: List[Dict],
+        video_id: str,
+        start_index: int = 0,
+        tags: Optional[List[str]] = None
+    ) -> int:
+        """Upsert questions into the vector store
+
+        ``start_index`` is the position of the first question in its source file,
+        so ids stay stable when a file is added in chunks. Each question carries a
+        hash of its content; questions whose stored hash is unchanged are skipped
+        without being embedded or written. Questions that only got a fallback
+        embedding are stored without a hash, so they are retried next time. ``tags`` are stored as filterable
+        metadata (see ``search``). Returns the number of questions written.
+        """
         if section_num not in [2, 3]:
             raise ValueError("Only sections 2 and 3 are currently supported")
             
         collection = self.collections[f"section{section_num}"]
+
+        # Create a unique ID and content hash for each question
+        candidates = []
+        for idx, question in enumerate(questions, start_index):
+            question_id = f"{video_id}_{section_num}_{idx}"
+            candidates.append((idx, question_id, question, question_content_hash(question, tags)))
+        if not candidates:
+            return 0
+
+        # Look up the hashes already stored for these ids
+        existing = collection.get(ids=[question_id for _, question_id, _, _ in candidates], include=['metadatas'])
+        stored_metadata = {
+            question_id: metadata or {}
+            for question_id, metadata in zip(existing['ids'], existing['metadatas'])
+        }
         
         ids = []
         documents = []
         metadatas = []
+        payloads = []
         
-        for idx, question in enumerate(questions):
-            # Create a unique ID for each question
-            question_id = f"{video_id}_{section_num}_{idx}"
+        for idx, question_id, question, content_hash in candidates:
+            if stored_metadata.get(question_id, {}).get('content_hash') == content_hash:
+                continue
             ids.append(question_id)
+            payloads.append((question_id, question))
             
-            # Store the full question structure as metadata
-            metadatas.append({
+            # Only small filterable fields go into metadata; the full question
+            # structure is kept in the payload store
+            metadata = {
                 "video_id": video_id,
                 "section": section_num,
                 "question_index": idx,
-                "full_structure": json.dumps(question)
-            })
+                "content_hash": content_hash
+            }
+            for tag in tags or []:
+                metadata[f"tag_{tag}"] = True
+
+            # Upsert merges metadata, so clear keys that are no longer present:
+            # dropped tags and the full_structure copy legacy entries carry
+            # (None deletes the key)
+            for key in stored_metadata.get(question_id, {}):
+                metadata.setdefault(key, None)
+            metadatas.append(metadata)
             
             # Create a searchable document from the question content
             if section_num == 2:
@@ -210,38 +579,262 @@ class QuestionVectorStore:
                 Question: {question['Question']}
                 """
             documents.append(document)
+
+        if not ids:
+            return 0
+
+        self.payloads.put_many(section_num, payloads)
+        embeddings, fallbacks = self.embedding_fn.embed_with_fallbacks(documents)
+
+        # A fallback vector is not a real embedding: leave the content hash
+        # unset so the next add_questions call re-embeds the question
+        for metadata, is_fallback in zip(metadatas, fallbacks):
+            if is_fallback:
+                metadata["content_hash"] = None
         
-        # Add to collection
-        collection.add(
+        # Upsert so re-indexing replaces changed questions instead of duplicating them
+        collection.upsert(
             ids=ids,
+            embeddings=embeddings,
             documents=documents,
             metadatas=metadatas
         )
 
+        section = f"section{section_num}"
+        if section in self.dense_indexes:
+            self.dense_indexes[section].upsert(ids, embeddings)
+        self.collection_versions[section] += 1
+        return len(ids)
+
     def search_similar_questions(
         self, 
         section_num: int, 
         query: str, 
         n_results: int = 5
     ) -> List[Dict]:
-        """Search for similar questions in the vector store"""
+        """Search for similar questions in the vector store
+
+        Results are served from an LRU/TTL cache keyed by the section, query,
+        n_results and collection version.
+        """
+        return self.search_many(section_num, [query], n_results)[0]
+
+    def search_many(
+        self,
+        section_num: int,
+        queries: List[str],
+        n_results: int = 5
+    ) -> List[List[Dict]]:
+        """Search for several queries at once, returning one result list per query
+
+        Queries that are not in the result cache are embedded in a single call
+        and sent to Chroma as one vectorized query.
+        """
         if section_num not in [2, 3]:
             raise ValueError("Only sections 2 and 3 are currently supported")
             
-        collection = self.collections[f"section{section_num}"]
-        
-        results = collection.query(
-            query_texts=[query],
-            n_results=n_results
+        section = f"section{section_num}"
+        version = self.collection_versions[section]
+        results_by_query = {}
+        for query in queries:
+            cached = self.query_cache.get((section, query, n_results, version))
+            if cached is not None:
+                results_by_query[query] = cached
+
+        misses = [query for query in dict.fromkeys(queries) if query not in results_by_query]
+        if misses:
+            collection = self.collections[section]
+            query_embeddings = self.embedding_fn(misses)
+
+            if self.in_memory_search:
+                dense_results = self._dense_index(section).search_many(query_embeddings, n_results)
+                results = {
+                    'ids': [ids for ids, _ in dense_results],
+                    'distances': [distances for _, distances in dense_results]
+                }
+            else:
+                results = collection.query(
+                    query_embeddings=query_embeddings,
+                    n_results=n_results,
+                    include=['distances']
+                )
+            
+            # Hydrate the hits of every query with one payload lookup
+            all_ids = [question_id for ids in results['ids'] for question_id in ids]
+            payloads = self._hydrate_questions(collection, all_ids)
+            for query, ids, distances in zip(misses, results['ids'], results['distances']):
+                # Convert results to more usable format
+                questions = []
+                for question_id, distance in zip(ids, distances):
+                    if question_id not in payloads:
+                        continue
+                    question_data = copy.deepcopy(payloads[question_id])
+                    question_data['similarity_score'] = distance
+                    questions.append(question_data)
+
+                self.query_cache.put((section, query, n_results, version), questions)
+                results_by_query[query] = questions
+
+        # Repeated queries each get their own copy of the results
+        return [copy.deepcopy(results_by_query[query]) for query in queries]
+
+    def search_diverse(
+        self,
+        section_num: int,
+        query: str,
+        n_results: int = 3,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5
+    ) -> List[Dict]:
+        """Search for relevant but mutually different questions
+
+        Over-fetches ``fetch_k`` nearest candidates with their stored embeddings
+        and picks ``n_results`` of them by maximal marginal relevance, so the
+        results are not near-duplicates of each other (e.g. from the same video).
+        """
+        if section_num not in [2, 3]:
+            raise ValueError("Only sections 2 and 3 are currently supported")
+
+        section = f"section{section_num}"
+        cache_key = (
+            "diverse", section, query, n_results, fetch_k, lambda_mult,
+            self.collection_versions[section]
         )
-        
-        # Convert results to more usable format
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        collection = self.collections[section]
+        query_embedding = self.embedding_fn([query])[0]
+        fetch_k = max(fetch_k, n_results)
+
+        if self.in_memory_search:
+            index = self._dense_index(section)
+            ids, distances = index.search(query_embedding, fetch_k)
+            embeddings = index.get_vectors(ids) if ids else []
+        else:
+            results = collection.query(
+                query_embeddings=[query_embedding],
+                n_results=fetch_k,
+                include=['embeddings', 'distances']
+            )
+            ids, distances, embeddings = results['ids'][0], results['distances'][0], results['embeddings'][0]
+
+        selected = maximal_marginal_relevance(query_embedding, embeddings, n_results, lambda_mult)
+        payloads = self._hydrate_questions(collection, [ids[i] for i in selected])
+
         questions = []
-        for idx, metadata in enumerate(results['metadatas'][0]):
-            question_data = json.loads(metadata['full_structure'])
-            question_data['similarity_score'] = results['distances'][0][idx]
+        for i in selected:
+            if ids[i] not in payloads:
+                continue
+            question_data = payloads[ids[i]]
+            question_data['similarity_score'] = distances[i]
             questions.append(question_data)
-            
+
+        self.query_cache.put(cache_key, questions)
+        return questions
+
+    def search(
+        self,
+        query: str,
+        sections: Sequence[int] = (2, 3),
+        n_results: int = 5,
+        video_id: Optional[Union[str, List[str]]] = None,
+        tags: Optional[List[str]] = None,
+        where: Optional[Dict] = None
+    ) -> List[Dict]:
+        """Search one or more sections at once, with optional metadata filters
+
+        The query is embedded once, filters (video_id, tags, or any extra Chroma
+        ``where`` clause) are pushed down to each section's index, and the hits
+        are merged into a single list ranked by distance. Each result carries
+        its ``section`` and ``question_id``.
+        """
+        sections = list(dict.fromkeys(sections))
+        for section_num in sections:
+            if section_num not in [2, 3]:
+                raise ValueError("Only sections 2 and 3 are currently supported")
+
+        where_clause = build_where(video_id, tags, where)
+        versions = tuple(self.collection_versions[f"section{section_num}"] for section_num in sections)
+        cache_key = (
+            "search", tuple(sections), query, n_results,
+            json.dumps(where_clause, sort_keys=True), versions
+        )
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        query_embeddings = self.embedding_fn([query])
+        hits = []
+        for section_num in sections:
+            collection = self.collections[f"section{section_num}"]
+            if self.in_memory_search and where_clause is None:
+                ids, distances = self._dense_index(f"section{section_num}").search(query_embeddings[0], n_results)
+                results = {'ids': [ids], 'distances': [distances]}
+            else:
+                results = collection.query(
+                    query_embeddings=query_embeddings,
+                    n_results=n_results,
+                    where=where_clause,
+                    include=['distances']
+                )
+            payloads = self._hydrate_questions(collection, results['ids'][0])
+            for question_id, distance in zip(results['ids'][0], results['distances'][0]):
+                if question_id in payloads:
+                    hits.append((distance, section_num, question_id, payloads[question_id]))
+
+        # Merge the per-section rankings
+        hits.sort(key=lambda hit: hit[0])
+        questions = []
+        for distance, section_num, question_id, question_data in hits[:n_results]:
+            question_data['similarity_score'] = distance
+            question_data['section'] = section_num
+            question_data['question_id'] = question_id
+            questions.append(question_data)
+
+        self.query_cache.put(cache_key, questions)
+        return questions
+
+    def _dense_index(self, section: str) -> DenseIndex:
+        """Return the in-memory index for a section, (re)loading it from Chroma when stale"""
+        collection = self.collections[section]
+        with self._dense_lock:
+            index = self.dense_indexes.get(section)
+            stale = (
+                index is None
+                or time.monotonic() - self._dense_loaded_at[section] > self.dense_index_ttl
+                or collection.count() != len(index)
+            )
+            if stale:
+                index = DenseIndex()
+                stored = collection.get(include=['embeddings'])
+                if len(stored['ids']):
+                    index.upsert(stored['ids'], stored['embeddings'])
+                self.dense_indexes[section] = index
+                self._dense_loaded_at[section] = time.monotonic()
+            return index
+
+    def _hydrate_questions(self, collection, question_ids: List[str]) -> Dict[str, Dict]:
+        """Look up full questions by id in the payload store
+
+        Questions indexed before the payload store existed still carry their
+        structure as JSON in Chroma metadata; those are decoded once and copied
+        into the payload store.
+        """
+        questions = self.payloads.get_many(question_ids)
+        missing = [question_id for question_id in question_ids if question_id not in questions]
+        if missing:
+            legacy = collection.get(ids=missing, include=['metadatas'])
+            backfill = {}
+            for question_id, metadata in zip(legacy['ids'], legacy['metadatas']):
+                if metadata and 'full_structure' in metadata:
+                    backfill.setdefault(metadata.get('section'), []).append(
+                        (question_id, json.loads(metadata['full_structure']))
+                    )
+            for section_num, items in backfill.items():
+                self.payloads.put_many(section_num, items)
+                questions.update(copy.deepcopy(dict(items)))
         return questions
 
     def get_question_by_id(self, section_num: int, question_id: str) -> Optional[Dict]:
@@ -250,76 +843,171 @@ class QuestionVectorStore:
             raise ValueError("Only sections 2 and 3 are currently supported")
             
         collection = self.collections[f"section{section_num}"]
-        
-        result = collection.get(
-            ids=[question_id],
-            include=['metadatas']
-        )
-        
-        if result['metadatas']:
-            return json.loads(result['metadatas'][0]['full_structure'])
-        return None
+        return self._hydrate_questions(collection, [question_id]).get(question_id)
+
+    def export_snapshot(self, path: str) -> int:
+        """Export ids, embeddings, documents and question payloads to one snapshot file
+
+        The snapshot stores a raw float32 matrix (memory-mappable) and a
+        compressed record block; see vector_snapshot.py. Returns the number of
+        questions exported.
+        """
+        sections = {}
+        dimension = 0
+        for section_num in [2, 3]:
+            collection = self.collections[f"section{section_num}"]
+            stored = collection.get(include=['embeddings', 'documents', 'metadatas'])
+            payloads = self._hydrate_questions(collection, stored['ids'])
+
+            records = []
+            embeddings = []
+            for question_id, embedding, document, metadata in zip(
+                stored['ids'], stored['embeddings'], stored['documents'], stored['metadatas']
+            ):
+                if question_id not in payloads:
+                    continue
+                metadata = {key: value for key, value in (metadata or {}).items() if key != 'full_structure'}
+                records.append({
+                    "id": question_id,
+                    "document": document,
+                    "metadata": metadata,
+                    "question": payloads[question_id]
+                })
+                embeddings.append(embedding)
+            if embeddings:
+                dimension = len(embeddings[0])
+            sections[section_num] = {"records": records, "embeddings": embeddings}
+
+        write_snapshot(path, dimension, sections, model_id=self.embedding_fn.model_id)
+        return sum(len(data["records"]) for data in sections.values())
+
+    def import_snapshot(self, path: str, chunk_size: int = 1000) -> int:
+        """Load a snapshot written by export_snapshot without any embedding calls
+
+        Embeddings are read from the memory-mapped matrix and upserted into
+        Chroma as-is; the document embeddings are also seeded into the
+        embedding cache. Returns the number of questions imported.
+        """
+        snapshot = read_snapshot(path)
+        if snapshot["model_id"] and snapshot["model_id"] != self.embedding_fn.model_id:
+            raise ValueError(
+                f"Snapshot was built with {snapshot['model_id']}, store uses {self.embedding_fn.model_id}"
+            )
+
+        imported = 0
+        for section_num in [2, 3]:
+            section = f"section{section_num}"
+            rows = section_slice(snapshot, section_num)
+            records = snapshot["records"][rows]
+            embeddings = snapshot["embeddings"][rows]
+            if not records:
+                continue
+
+            collection = self.collections[section]
+            for start in range(0, len(records), chunk_size):
+                chunk = records[start:start + chunk_size]
+                chunk_embeddings = np.asarray(embeddings[start:start + chunk_size], dtype=np.float32)
+                ids = [record["id"] for record in chunk]
+                documents = [record["document"] for record in chunk]
+
+                self.payloads.put_many(section_num, [(record["id"], record["question"]) for record in chunk])
+                collection.upsert(
+                    ids=ids,
+                    embeddings=chunk_embeddings.tolist(),
+                    documents=documents,
+                    metadatas=[record["metadata"] for record in chunk]
+                )
+                self.embedding_fn.cache.put_many(
+                    (self.embedding_fn._get_text_hash(document), embedding)
+                    for document, embedding in zip(documents, chunk_embeddings)
+                )
+                if section in self.dense_indexes:
+                    self.dense_indexes[section].upsert(ids, chunk_embeddings)
+
+            self.collection_versions[section] += 1
+            imported += len(records)
+        return imported
 
     def parse_questions_from_file(self, filename: str) -> List[Dict]:
         """Parse questions from a structured text file"""
-        questions = []
-        current_question = {}
-        
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                
-            i = 0
-            while i < len(lines):
-                line = lines[i].strip()
-                
-                if line.startswith('<question>'):
-                    current_question = {}
-                elif line.startswith('Introduction:'):
-                    i += 1
-                    if i < len(lines):
-                        current_question['Introduction'] = lines[i].strip()
-                elif line.startswith('Conversation:'):
-                    i += 1
-                    if i < len(lines):
-                        current_question['Conversation'] = lines[i].strip()
-                elif line.startswith('Situation:'):
-                    i += 1
-                    if i < len(lines):
-                        current_question['Situation'] = lines[i].strip()
-                elif line.startswith('Question:'):
-                    i += 1
-                    if i < len(lines):
-                        current_question['Question'] = lines[i].strip()
-                elif line.startswith('Options:'):
-                    options = []
-                    for _ in range(4):
-                        i += 1
-                        if i < len(lines):
-                            option = lines[i].strip()
-                            if option.startswith('1.') or option.startswith('2.') or option.startswith('3.') or option.startswith('4.'):
-                                options.append(option[2:].strip())
-                    current_question['Options'] = options
-                elif line.startswith('</question>'):
-                    if current_question:
-                        questions.append(current_question)
-                        current_question = {}
-                i += 1
-            return questions
+            return list(iter_questions_from_file(filename))
         except Exception as e:
             print(f"Error parsing questions from {filename}: {str(e)}")
             return []
 
-    def index_questions_file(self, filename: str, section_num: int):
-        """Index all questions from a file into the vector store"""
+    def _checkpoint_path(self, filename: str, section_num: int) -> str:
+        """Path of the resume checkpoint for an indexed file"""
+        name = os.path.basename(filename)
+        return os.path.join(self.checkpoint_directory, f"{name}.section{section_num}.json")
+
+    def _load_checkpoint(self, path: str, content_hash: str) -> int:
+        """Number of questions already committed for this exact file content"""
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('content_hash') == content_hash:
+                return int(checkpoint.get('committed', 0))
+        except Exception as e:
+            print(f"Error reading checkpoint {path}: {str(e)}")
+        return 0
+
+    def _save_checkpoint(self, path: str, content_hash: str, committed: int):
+        """Atomically record how many questions of a file have been committed"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"content_hash": content_hash, "committed": committed}, f)
+        os.replace(tmp_path, path)
+
+    def index_questions_file(
+        self,
+        filename: str,
+        section_num: int,
+        chunk_size: int = 100,
+        resume: bool = True
+    ) -> int:
+        """Stream questions from a file into the vector store in fixed-size chunks
+
+        A checkpoint is written after every committed chunk, so an interrupted run
+        resumes from the last committed chunk (as long as the file is unchanged).
+        Returns the number of questions from the file that are in the store.
+        """
         # Extract video ID from filename
         video_id = os.path.basename(filename).split('_section')[0]
-        
-        # Parse questions from file
-        questions = self.parse_questions_from_file(filename)
-        
-        if questions:
-            # Add questions to vector store
-            self.add_questions(section_num, questions, video_id)
-            return len(questions)
-        return 0
+
+        try:
+            content_hash = file_content_hash(filename)
+        except OSError as e:
+            print(f"Error reading {filename}: {str(e)}")
+            return 0
+
+        checkpoint_path = self._checkpoint_path(filename, section_num)
+        committed = self._load_checkpoint(checkpoint_path, content_hash) if resume else 0
+        if committed:
+            print(f"Resuming {filename} after {committed} committed questions")
+
+        questions = iter_questions_from_file(filename)
+        questions = itertools.islice(questions, committed, None)
+
+        started = time.time()
+        indexed = 0
+        try:
+            while True:
+                chunk = list(itertools.islice(questions, chunk_size))
+                if not chunk:
+                    break
+
+                self.add_questions(section_num, chunk, video_id, start_index=committed)
+                committed += len(chunk)
+                indexed += len(chunk)
+                self._save_checkpoint(checkpoint_path, content_hash, committed)
+
+                elapsed = max(time.time() - started, 1e-9)
+                print(f"Indexed {committed} questions from {os.path.basename(filename)} "
+                      f"({indexed / elapsed:.1f} questions/s)")
+        except Exception as e:
+            print(f"Error indexing {filename} after {committed} questions: {str(e)}")
+
+        return committed